@@ -5,12 +5,15 @@ import os
 from datetime import timedelta
 from flask import Flask
 from flask_cors import CORS
+from app import codec, storage
 
 def create_app(test_config=None):
     """
     Create and configure the Flask application instance
     """
     app = Flask(__name__, instance_relative_config=True)
+    app.json_provider_class = codec.CodecJSONProvider
+    app.json = app.json_provider_class(app)
     
     # Load configuration
     if test_config is None:
@@ -20,6 +23,10 @@ def create_app(test_config=None):
     else:
         app.config.from_mapping(test_config)
     
+    # Select the JSON codec for attribute blobs and responses
+    codec.use_backend(app.config.get('JSON_CODEC', 'auto'))
+    storage.use_format(app.config.get('ATTRIBUTE_STORAGE_FORMAT', storage.JSON))
+    
     # Ensure the instance folder exists
     try:
         os.makedirs(app.instance_path, exist_ok=True)
@@ -31,11 +38,19 @@ def create_app(test_config=None):
     if not os.path.exists(data_dir):
         os.makedirs(data_dir, exist_ok=True)
     
+    # Register the read replica as a bind so its engine is managed with the primary's
+    replica_uri = app.config.get('DATABASE_REPLICA_URI')
+    if replica_uri:
+        app.config['SQLALCHEMY_BINDS'] = dict(app.config.get('SQLALCHEMY_BINDS') or {}, replica=replica_uri)
+    
     # Set up extensions
-    from app.extensions import db, jwt, ma
+    from app.extensions import db, jwt, ma, metrics, persona_cache, profiler
+    from app.models import ensure_columns, ensure_indexes
+    from app.services import total_count_cache
     db.init_app(app)
     jwt.init_app(app)
     ma.init_app(app)
+    persona_cache.init_app(app)
     
     # Configure CORS
     origins = app.config.get('CORS_ORIGINS', '*')
@@ -54,5 +69,17 @@ def create_app(test_config=None):
     # Create database tables if they don't exist
     with app.app_context():
         db.create_all()
+        ensure_columns(db.engine)
+        ensure_indexes(db.engine)
+        
+        # Request, SQL, cache and pool metrics at /metrics
+        if app.config.get('METRICS_ENABLED', True):
+            metrics.init_app(app, db.engines.values())
+        
+        # Opt-in request profiling and slow-query log
+        profiler.init_app(app, db.engines.values())
+
+    # Apply the persona count cache lifetime
+    total_count_cache.ttl = app.config.get('PERSONA_COUNT_CACHE_SECONDS', 5.0)
     
     return app
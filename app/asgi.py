@@ -0,0 +1,199 @@
+"""
+Async ASGI serving mode for the Persona Service
+
+The Flask application is served unchanged, so every route keeps its exact
+request and response contract, but its database I/O goes through an async
+driver (aiosqlite, asyncpg) instead of blocking a worker thread. Each request
+runs the WSGI app inside sqlalchemy.util.greenlet_spawn: whenever the
+request waits on the database its greenlet is suspended and the event loop
+serves other requests, so one process holds many requests in flight. CPU
+work such as serialization still runs on the event loop thread, one request
+at a time.
+
+Needs an ASGI server and the async driver, e.g. pip install uvicorn aiosqlite:
+
+    python run.py --asgi
+    uvicorn --factory app.asgi:create_asgi_app --port 5050
+"""
+import asyncio
+import io
+import logging
+import sys
+from sqlalchemy.util import await_only, greenlet_spawn
+from app import create_app
+from app.database import async_url
+
+logger = logging.getLogger(__name__)
+
+class ASGIApp:
+    """ASGI application running a Flask app's requests in greenlets"""
+
+    def __init__(self, test_config=None):
+        """
+        Initialize without building the Flask app
+
+        The Flask app creates its tables on start-up, which needs the async
+        engine and therefore a running event loop; it is built at lifespan
+        start-up or on the first request.
+
+        Args:
+            test_config: Configuration mapping passed to create_app
+        """
+        self.test_config = test_config
+        self.app = None
+        self._starting = None
+
+    def _build_app(self):
+        """Create the Flask app with the database URIs switched to their async drivers"""
+        if self.test_config is None:
+            from app import config
+            settings = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+        else:
+            settings = dict(self.test_config)
+        settings['SQLALCHEMY_DATABASE_URI'] = async_url(settings['SQLALCHEMY_DATABASE_URI'])
+        if settings.get('DATABASE_REPLICA_URI'):
+            settings['DATABASE_REPLICA_URI'] = async_url(settings['DATABASE_REPLICA_URI'])
+        return create_app(settings)
+
+    async def startup(self):
+        """Build the Flask app if it does not exist yet"""
+        if self.app is None:
+            # Requests arriving before the app exists wait for the same build
+            if self._starting is None:
+                self._starting = asyncio.ensure_future(greenlet_spawn(self._build_app))
+            self.app = await self._starting
+
+    async def shutdown(self):
+        """Close the pooled database connections"""
+        if self.app is None:
+            return
+        from app.extensions import db
+        with self.app.app_context():
+            for engine in db.engines.values():
+                await greenlet_spawn(engine.dispose)
+
+    async def __call__(self, scope, receive, send):
+        """Handle an ASGI lifespan or HTTP connection"""
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.startup()
+            body = await self._read_body(receive)
+            await greenlet_spawn(self._handle, scope, body, send)
+        else:
+            raise RuntimeError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive, send):
+        """Build the app at start-up and dispose of its engines at shutdown"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await self.startup()
+                except Exception as e:
+                    logger.error(f"Failed to start the ASGI app: {str(e)}")
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        """Read the whole request body"""
+        chunks = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                break
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                break
+        return b''.join(chunks)
+
+    def _handle(self, scope, body, send):
+        """
+        Run one request through the WSGI app; called in a greenlet
+
+        The response body is iterated in the same greenlet, so streamed
+        responses such as /personas/export keep their request context and
+        can query the database between chunks.
+        """
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            status_code = int(status.split(' ', 1)[0])
+            started[:] = [status_code, [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                        for name, value in headers]]
+
+        def send_start():
+            await_only(send({'type': 'http.response.start', 'status': started[0], 'headers': started[1]}))
+
+        result = self.app.wsgi_app(wsgi_environ(scope, body), start_response)
+        try:
+            headers_sent = False
+            for chunk in result:
+                if not chunk:
+                    continue
+                if not headers_sent:
+                    send_start()
+                    headers_sent = True
+                await_only(send({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+            if not headers_sent:
+                send_start()
+            await_only(send({'type': 'http.response.body', 'body': b'', 'more_body': False}))
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+def wsgi_environ(scope, body):
+    """Build the WSGI environ of an ASGI HTTP request"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]) if server[1] is not None else '80',
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name == 'CONTENT_LENGTH':
+            environ['CONTENT_LENGTH'] = value
+        else:
+            key = f'HTTP_{name}'
+            separator = '; ' if name == 'COOKIE' else ','
+            environ[key] = f'{environ[key]}{separator}{value}' if key in environ else value
+    if 'CONTENT_LENGTH' not in environ and body:
+        environ['CONTENT_LENGTH'] = str(len(body))
+    return environ
+
+def create_asgi_app(test_config=None):
+    """
+    Create the ASGI application
+
+    Args:
+        test_config: Configuration mapping for create_app (default: app.config);
+            its database URIs are switched to the backend's async driver
+
+    Returns:
+        ASGIApp: The application, to be served by an ASGI server such as uvicorn
+    """
+    return ASGIApp(test_config)
@@ -0,0 +1,110 @@
+"""
+In-process cache of serialized personas
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+CachedPersona = namedtuple('CachedPersona', ['updated_at', 'payload', 'expires_at'])
+
+class PersonaCache:
+    """
+    Size-bounded LRU cache of ready-to-send persona JSON with a TTL
+
+    Entries are keyed by persona ID and carry the persona's updated_at.
+    PersonaService invalidates an entry whenever it writes that persona. Each
+    invalidation bumps a generation counter, and set() drops values read
+    before the latest invalidation, so a slow reader cannot put back a
+    version that a concurrent writer just replaced. Writes made by other
+    processes are only picked up once the TTL expires.
+    """
+
+    def __init__(self, maxsize=0, ttl=1.0):
+        """Initialize with a maximum entry count and lifetime in seconds"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        """Configure size and lifetime from the application config"""
+        self.maxsize = app.config.get('PERSONA_CACHE_SIZE', self.maxsize)
+        self.ttl = app.config.get('PERSONA_CACHE_TTL', self.ttl)
+        self.clear()
+
+    @property
+    def enabled(self):
+        """Whether the cache stores anything at all"""
+        return self.maxsize > 0 and self.ttl > 0
+
+    def generation(self):
+        """Return a token to pass to set() for values read after this call"""
+        return self._generation
+
+    def get(self, persona_id):
+        """Return the CachedPersona for persona_id, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(persona_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry.expires_at <= time.monotonic():
+                del self._entries[persona_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(persona_id)
+            self.hits += 1
+            return entry
+
+    def set(self, persona_id, updated_at, payload, generation=None):
+        """
+        Store the serialized payload for a persona
+
+        Args:
+            generation: Value of generation() taken before the persona was
+                read; the payload is discarded if an invalidation happened since
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[persona_id] = CachedPersona(updated_at, payload, time.monotonic() + self.ttl)
+            self._entries.move_to_end(persona_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, persona_id):
+        """Drop the entry for a persona that was written"""
+        with self._lock:
+            self._generation += 1
+            if self._entries.pop(persona_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        """Drop all entries"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss/eviction counters and current size"""
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,71 @@
+"""
+JSON codec used for attribute blobs and API responses
+
+orjson is used when it is installed and falls back to the standard library
+json module otherwise. The backend can be forced with use_backend() (the
+JSON_CODEC setting).
+"""
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+BACKENDS = ('auto', 'json', 'orjson')
+
+_use_orjson = orjson is not None
+
+def use_backend(name):
+    """Select the codec backend: 'auto', 'json' or 'orjson'"""
+    global _use_orjson
+    if name not in BACKENDS:
+        raise ValueError(f"Invalid JSON codec: {name}")
+    if name == 'orjson' and orjson is None:
+        raise ValueError("JSON codec 'orjson' requested but orjson is not installed")
+    _use_orjson = orjson is not None and name != 'json'
+
+def backend():
+    """Name of the backend in use"""
+    return 'orjson' if _use_orjson else 'json'
+
+def loads(data):
+    """Decode JSON text or bytes; raises ValueError on invalid input"""
+    if _use_orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps(obj, sort_keys=False):
+    """Encode an object as compact JSON text"""
+    if _use_orjson:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, option=option).decode()
+        except TypeError:
+            # Values orjson rejects (e.g. integers over 64 bits) use the stdlib encoder
+            pass
+    return json.dumps(obj, sort_keys=sort_keys, separators=(',', ':'))
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes responses and decodes requests with the codec"""
+
+    def dumps(self, obj, **kwargs):
+        """Serialize obj to JSON, falling back to Flask's encoder for unsupported types"""
+        # Flask asks for compact output with separators; indented output stays on the stdlib
+        if _use_orjson and kwargs.keys() <= {'separators'} and kwargs.get('separators', (',', ':')) == (',', ':'):
+            # Route dates and dataclasses through Flask's default() so output matches the stdlib provider
+            option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                      | orjson.OPT_PASSTHROUGH_DATACLASS
+                      | (orjson.OPT_SORT_KEYS if self.sort_keys else 0))
+            try:
+                return orjson.dumps(obj, default=self.default, option=option).decode()
+            except TypeError:
+                pass
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        """Deserialize JSON request data"""
+        if _use_orjson and not kwargs:
+            return orjson.loads(s)
+        return super().loads(s, **kwargs)
@@ -11,11 +11,82 @@ db_path = os.path.abspath(os.path.join(os.path.dirname(os.path.dirname(__file__)
 SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URI", f"sqlite:///{db_path}")
 SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+# Optional read replica for persona reads; clients read from the primary for
+# REPLICA_STICKY_SECONDS after their own writes
+DATABASE_REPLICA_URI = os.getenv("DATABASE_REPLICA_URI") or None
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# Connection pool for file and server databases (DB_POOL_RECYCLE=-1 never recycles)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_POOL_MAX_OVERFLOW = int(os.getenv("DB_POOL_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+# SQLite profile applied to every new connection (see app/database.py); leave a value empty to keep SQLite's default
+SQLITE_PROFILE_ENABLED = os.getenv("SQLITE_PROFILE_ENABLED", "true").lower() in ("1", "true", "yes")
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))
+SQLITE_CACHE_SIZE = os.getenv("SQLITE_CACHE_SIZE", "-65536")  # Negative values are KiB (64 MiB)
+SQLITE_TEMP_STORE = os.getenv("SQLITE_TEMP_STORE", "MEMORY")
+SQLITE_BUSY_TIMEOUT = os.getenv("SQLITE_BUSY_TIMEOUT", "5000")  # Milliseconds
+
 # API settings
 API_VERSION = "v1"
 API_TITLE = "Persona Service API"
 API_DESCRIPTION = "API for managing user personas"
 
+# JSON codec for attribute blobs and responses: auto (orjson if installed), json or orjson
+JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+
+# Encoding for newly written attribute data: json or zlib-v1 (see app/storage.py)
+ATTRIBUTE_STORAGE_FORMAT = os.getenv("ATTRIBUTE_STORAGE_FORMAT", "json")
+
+# Seconds the unfiltered persona total is reused before COUNT(*) runs again
+PERSONA_COUNT_CACHE_SECONDS = float(os.getenv("PERSONA_COUNT_CACHE_SECONDS", "5"))
+
+# Serialized persona cache, off unless PERSONA_CACHE_SIZE is set. It is per
+# process: with several workers, a persona written through one worker can be
+# served stale by another for up to PERSONA_CACHE_TTL seconds
+PERSONA_CACHE_SIZE = int(os.getenv("PERSONA_CACHE_SIZE", "0"))
+PERSONA_CACHE_TTL = float(os.getenv("PERSONA_CACHE_TTL", "1"))
+
+# Seconds the next-dump cursor of GET /personas/export reaches back before the
+# export's start, to cover writes still committing (and replica lag)
+EXPORT_CURSOR_OVERLAP_SECONDS = float(os.getenv("EXPORT_CURSOR_OVERLAP_SECONDS", "60"))
+
+# Largest chunk_size accepted by GET /personas/export; memory per export grows with it
+EXPORT_MAX_CHUNK_SIZE = int(os.getenv("EXPORT_MAX_CHUNK_SIZE", "5000"))
+
+# Largest k accepted by GET /personas/near
+NEAR_MAX_RESULTS = int(os.getenv("NEAR_MAX_RESULTS", "1000"))
+
+# Accept attribute fields that are not declared in persona_field_config
+ALLOW_UNKNOWN_FIELDS = os.getenv("ALLOW_UNKNOWN_FIELDS", "true").lower() in ("1", "true", "yes")
+
+# Largest array accepted by POST /personas/bulk
+BULK_CREATE_MAX_ITEMS = int(os.getenv("BULK_CREATE_MAX_ITEMS", "10000"))
+
+# Most ids accepted by GET /personas?ids= and POST /personas:batchGet
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", "1000"))
+
+# Prometheus-style /metrics endpoint; set METRICS_DIR to a directory shared by
+# the workers (cleared before start-up) to aggregate across gunicorn workers
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+METRICS_DIR = os.getenv("METRICS_DIR") or None
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "1"))
+
+# Per-request profiling: requests sending PROFILING_HEADER are profiled when
+# enabled; raw profiles are saved to PROFILING_DIR if set
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILING_DIR = os.getenv("PROFILING_DIR") or None
+PROFILING_TOP_FUNCTIONS = int(os.getenv("PROFILING_TOP_FUNCTIONS", "25"))
+
+# Log SQL statements taking at least this many milliseconds (unset to disable)
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "0")) or None
+
 # JWT settings
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "dev-secret-key")  # Change in production!
 JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=int(os.getenv("JWT_ACCESS_TOKEN_HOURS", "1")))
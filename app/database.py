@@ -0,0 +1,335 @@
+"""
+Database engine setup for the Persona Service
+
+Every engine in the service and its scripts is built by make_engine, so all
+of them get the same pool settings, SQLite profile, pool instrumentation and
+fork handling. Scripts share one engine per URI through get_engine; the
+Flask app builds its engine through the SQLAlchemy extension subclass below.
+
+URIs with an async driver (sqlite+aiosqlite, postgresql+asyncpg) get an
+AsyncEngine, of which make_engine returns the synchronous facade. Such an
+engine only works inside sqlalchemy.util.greenlet_spawn, which is how the
+ASGI mode in app/asgi.py runs requests.
+"""
+import math
+import os
+import threading
+import time
+import weakref
+import sqlalchemy as sa
+from flask_sqlalchemy import SQLAlchemy as BaseSQLAlchemy
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Accepted values for the PRAGMAs that take a keyword
+JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+TEMP_STORES = ('DEFAULT', 'FILE', 'MEMORY')
+
+SETTING_PREFIXES = ('SQLITE_', 'DB_POOL_')
+
+# SQL math functions used by distance queries, registered on SQLite builds
+# compiled without SQLITE_ENABLE_MATH_FUNCTIONS (SQLite < 3.35 or custom builds)
+SQLITE_MATH_FUNCTIONS = {'sin': math.sin, 'cos': math.cos, 'radians': math.radians}
+
+# Async driver used for each backend when serving through app/asgi.py
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg', 'mysql': 'aiomysql'}
+
+_profiled_engines = weakref.WeakSet()
+_engines = weakref.WeakSet()
+_shared_engines = {}
+_shared_engines_lock = threading.Lock()
+
+def _settings(overrides=None):
+    """Engine settings from app.config, updated with any given in overrides"""
+    from app import config
+    settings = {name: getattr(config, name) for name in dir(config) if name.startswith(SETTING_PREFIXES)}
+    if overrides is not None:
+        settings.update((name, value) for name, value in overrides.items() if name.startswith(SETTING_PREFIXES))
+    return settings
+
+def sqlite_pragmas(settings=None):
+    """
+    Build the PRAGMA statements of the SQLite profile
+
+    Args:
+        settings: Mapping with SQLITE_* settings overriding those in app.config
+
+    Returns:
+        list: PRAGMA statements, in the order they should run on a new connection
+    """
+    settings = _settings(settings)
+    if not settings.get('SQLITE_PROFILE_ENABLED', True):
+        return []
+
+    def keyword(name, allowed):
+        value = settings.get(name)
+        if value in (None, ''):
+            return None
+        value = str(value).upper()
+        if value not in allowed:
+            raise ValueError(f"Invalid {name}: {value} (expected one of: {', '.join(allowed)})")
+        return value
+
+    def number(name):
+        value = settings.get(name)
+        if value in (None, ''):
+            return None
+        return int(value)
+
+    pragmas = []
+    # Set first so switching the journal mode waits for other connections instead of failing
+    busy_timeout = number('SQLITE_BUSY_TIMEOUT')
+    if busy_timeout is not None:
+        pragmas.append(f'PRAGMA busy_timeout={busy_timeout}')
+    journal_mode = keyword('SQLITE_JOURNAL_MODE', JOURNAL_MODES)
+    if journal_mode is not None:
+        pragmas.append(f'PRAGMA journal_mode={journal_mode}')
+    synchronous = keyword('SQLITE_SYNCHRONOUS', SYNCHRONOUS_MODES)
+    if synchronous is not None:
+        pragmas.append(f'PRAGMA synchronous={synchronous}')
+    mmap_size = number('SQLITE_MMAP_SIZE')
+    if mmap_size is not None:
+        pragmas.append(f'PRAGMA mmap_size={mmap_size}')
+    cache_size = number('SQLITE_CACHE_SIZE')
+    if cache_size is not None:
+        pragmas.append(f'PRAGMA cache_size={cache_size}')
+    temp_store = keyword('SQLITE_TEMP_STORE', TEMP_STORES)
+    if temp_store is not None:
+        pragmas.append(f'PRAGMA temp_store={temp_store}')
+    return pragmas
+
+def apply_sqlite_profile(engine, settings=None):
+    """
+    Run the SQLite profile PRAGMAs on every new connection of engine
+
+    Engines for other databases are left alone, and an engine is only set up
+    once. Must be called before the engine opens its first connection, since
+    connections already in the pool are not changed.
+
+    Args:
+        engine: SQLAlchemy engine
+        settings: Mapping with SQLITE_* settings overriding those in app.config
+
+    Returns:
+        list: The PRAGMA statements applied
+    """
+    if engine.dialect.name != 'sqlite' or engine in _profiled_engines:
+        return []
+    pragmas = sqlite_pragmas(settings)
+    _profiled_engines.add(engine)
+    if not pragmas:
+        return []
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+    return pragmas
+
+def add_sqlite_math_functions(engine):
+    """Register SQLITE_MATH_FUNCTIONS on connections of a SQLite build that lacks them"""
+    if engine.dialect.name != 'sqlite':
+        return
+    operational_error = engine.dialect.dbapi.OperationalError
+
+    @event.listens_for(engine, 'connect')
+    def register_math_functions(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            cursor.execute('SELECT sin(0), cos(0), radians(0)')
+            return
+        except operational_error:
+            pass
+        finally:
+            cursor.close()
+        for name, function in SQLITE_MATH_FUNCTIONS.items():
+            dbapi_connection.create_function(name, 1, function, deterministic=True)
+
+class _InstrumentedPool:
+    """Pool mixin that records how long checkouts wait and how often they time out"""
+
+    def __init__(self, *args, **kwargs):
+        """Initialize the pool and its counters"""
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        """Check out a connection, timing the wait (including opening new connections)"""
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+                if timed_out:
+                    self.timeouts += 1
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    """QueuePool with checkout wait and timeout counters"""
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """Pool of async engines with checkout wait and timeout counters"""
+
+def is_async_url(url):
+    """Whether url names an async driver such as sqlite+aiosqlite"""
+    return bool(getattr(sa.engine.make_url(url).get_dialect(), 'is_async', False))
+
+def async_url(url):
+    """
+    The same database as url, through the backend's async driver
+
+    Args:
+        url: Database URL (string or sqlalchemy URL)
+
+    Returns:
+        str: url unchanged if it already uses an async driver
+
+    Raises:
+        ValueError: If there is no async driver for the backend
+    """
+    url = sa.engine.make_url(url)
+    if is_async_url(url):
+        return url.render_as_string(hide_password=False)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver for {url.get_backend_name()} databases")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+def _is_memory_sqlite(url):
+    """Whether url is an in-memory SQLite database"""
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+def engine_options(url, settings=None):
+    """
+    Build create_engine keyword arguments from the DB_POOL_* settings
+
+    Args:
+        url: Database URL (string or sqlalchemy URL)
+        settings: Mapping with DB_POOL_* settings overriding those in app.config
+
+    Returns:
+        dict: Keyword arguments for sqlalchemy.create_engine
+    """
+    settings = _settings(settings)
+    url = sa.engine.make_url(url)
+    options = {'pool_pre_ping': bool(settings.get('DB_POOL_PRE_PING', True))}
+    if _is_memory_sqlite(url):
+        # In-memory databases live in a single connection, so there is no pool to size
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncAdaptedQueuePool if is_async_url(url) else InstrumentedQueuePool,
+        pool_size=int(settings.get('DB_POOL_SIZE', 5)),
+        max_overflow=int(settings.get('DB_POOL_MAX_OVERFLOW', 10)),
+        pool_timeout=float(settings.get('DB_POOL_TIMEOUT', 30)),
+        pool_recycle=int(settings.get('DB_POOL_RECYCLE', 1800)),
+    )
+    return options
+
+def make_engine(url=None, settings=None, **options):
+    """
+    Create an engine with the service's pool settings and SQLite profile
+
+    Args:
+        url: Database URL (default: SQLALCHEMY_DATABASE_URI)
+        settings: Mapping with SQLITE_* and DB_POOL_* settings overriding those in app.config
+        **options: Extra create_engine arguments, taking precedence over the settings
+
+    Returns:
+        Engine: The new engine; for an async driver, the synchronous facade
+        (sync_engine) of a new AsyncEngine
+    """
+    if url is None:
+        from app.config import SQLALCHEMY_DATABASE_URI
+        url = SQLALCHEMY_DATABASE_URI
+    kwargs = engine_options(url, settings)
+    if options.get('poolclass') not in (None, QueuePool, InstrumentedQueuePool,
+                                        AsyncAdaptedQueuePool, InstrumentedAsyncAdaptedQueuePool):
+        # Sizing arguments only apply to queue pools
+        for name in ('pool_size', 'max_overflow', 'pool_timeout', 'pool_recycle'):
+            kwargs.pop(name, None)
+    kwargs.update(options)
+    if is_async_url(url):
+        from sqlalchemy.ext.asyncio import create_async_engine
+        engine = create_async_engine(url, **kwargs).sync_engine
+    else:
+        engine = sa.create_engine(url, **kwargs)
+    apply_sqlite_profile(engine, settings)
+    add_sqlite_math_functions(engine)
+    _engines.add(engine)
+    return engine
+
+def get_engine(url=None):
+    """Return the engine shared by this process for url, creating it on first use"""
+    if url is None:
+        from app.config import SQLALCHEMY_DATABASE_URI
+        url = SQLALCHEMY_DATABASE_URI
+    key = str(url)
+    with _shared_engines_lock:
+        engine = _shared_engines.get(key)
+        if engine is None:
+            engine = _shared_engines[key] = make_engine(url)
+    return engine
+
+def pool_stats(engine):
+    """
+    Describe the state of an engine's connection pool
+
+    Returns:
+        dict: Pool class, sizes and in-use connections, plus checkout wait
+        times when the pool is instrumented
+    """
+    pool = engine.pool
+    stats = {'pid': os.getpid(), 'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'checked_in': pool.checkedin(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+            'max_overflow': pool._max_overflow,
+        })
+    if isinstance(pool, _InstrumentedPool):
+        with pool._stats_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'checkout_wait_seconds_total': round(pool.wait_seconds, 6),
+                'checkout_wait_seconds_max': round(pool.max_wait_seconds, 6),
+                'checkout_timeouts': pool.timeouts,
+            })
+    return stats
+
+def _dispose_after_fork():
+    """Drop pooled connections inherited from the parent process"""
+    for engine in list(_engines):
+        # close=False leaves the parent's connections open for the parent to keep using
+        engine.dispose(close=False)
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_dispose_after_fork)
+
+class SQLAlchemy(BaseSQLAlchemy):
+    """Flask-SQLAlchemy extension whose engines are built by make_engine"""
+
+    def _make_engine(self, bind_key, options, app):
+        """Create the engine for a bind with the app's pool and SQLite settings"""
+        options = dict(options)
+        url = options.pop('url')
+        return make_engine(url, app.config, **options)
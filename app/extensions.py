@@ -1,11 +1,17 @@
 """
 Extensions used by the Persona Service
 """
-from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from flask_marshmallow import Marshmallow
+from app.cache import PersonaCache
+from app.database import SQLAlchemy
+from app.metrics import Metrics
+from app.profiling import RequestProfiler
 
 # Initialize extensions
 db = SQLAlchemy()
 jwt = JWTManager()
 ma = Marshmallow()
+persona_cache = PersonaCache()
+metrics = Metrics()
+profiler = RequestProfiler()
@@ -0,0 +1,143 @@
+"""
+Sparse fieldsets for persona reads
+
+fields= names what a response holds: id, name, created_at, updated_at,
+demographic or demographic.<column>, and a category or <category>.<field>.
+include= adds whole sections: demographic, psychographic, behavioral,
+contextual. Both take comma-separated lists. With only include=, the
+persona's own columns come with the sections. Without either, personas are
+returned in full.
+
+A selection decides what is queried as well as what is returned: unused
+persona and demographic columns are not selected, relationships nobody asked
+for are not loaded, and only the attribute categories asked for are fetched
+and decoded.
+"""
+import hashlib
+from sqlalchemy.orm import load_only, selectinload
+from app.models import AttributeCategory, DemographicData, Persona, PersonaAttributes
+
+PERSONA_FIELDS = ('id', 'name', 'created_at', 'updated_at')
+CATEGORIES = ('psychographic', 'behavioral', 'contextual')
+SECTIONS = ('demographic',) + CATEGORIES
+DEMOGRAPHIC_FIELDS = tuple(column.key for column in DemographicData.__table__.columns)
+
+class FieldSelection:
+    """The parts of a persona a read loads and returns"""
+
+    def __init__(self, persona_fields, sections):
+        """
+        Initialize from the persona columns and sections to return
+
+        Args:
+            persona_fields: Names from PERSONA_FIELDS; id is always returned
+            sections: Mapping of SECTIONS names to None for the whole section,
+                or to a tuple of the fields to return from it
+        """
+        self.persona_fields = tuple(name for name in PERSONA_FIELDS if name == 'id' or name in persona_fields)
+        self.sections = {name: sections[name] for name in SECTIONS if name in sections}
+        self.key = hashlib.sha1(repr((self.persona_fields, sorted(self.sections.items()))).encode()).hexdigest()[:12]
+
+    def load_options(self):
+        """Loader options for a Persona query that fetch just this selection"""
+        # updated_at is always loaded for ETags and cursors
+        columns = {'id', 'updated_at'} | set(self.persona_fields)
+        options = [load_only(*[getattr(Persona, name) for name in PERSONA_FIELDS if name in columns])]
+
+        if 'demographic' in self.sections:
+            loader = selectinload(Persona.demographic)
+            fields = self.sections['demographic']
+            if fields is not None:
+                loader = loader.load_only(*[getattr(DemographicData, name) for name in fields])
+            options.append(loader)
+
+        categories = [name for name in CATEGORIES if name in self.sections]
+        if len(categories) == len(CATEGORIES):
+            options.append(selectinload(Persona.attributes))
+        elif categories:
+            options.append(selectinload(Persona.attributes.and_(
+                PersonaAttributes.category.in_([AttributeCategory(name) for name in categories])
+            )))
+        return options
+
+    def serialize(self, persona):
+        """Dictionary representation of the selected parts of a persona"""
+        result = {}
+        for name in self.persona_fields:
+            value = getattr(persona, name)
+            result[name] = value.isoformat() if name in ('created_at', 'updated_at') and value else value
+
+        if 'demographic' in self.sections and persona.demographic:
+            fields = self.sections['demographic']
+            demographic = persona.demographic
+            result['demographic'] = (demographic.to_dict() if fields is None
+                                     else {name: getattr(demographic, name) for name in fields})
+
+        if any(name in self.sections for name in CATEGORIES):
+            for attr in persona.attributes:
+                category = attr.category.value if isinstance(attr.category, AttributeCategory) else attr.category
+                if category not in self.sections:
+                    continue
+                fields = self.sections[category]
+                data = attr.get_data()
+                result[category] = data if fields is None else {name: data[name] for name in fields if name in data}
+        return result
+
+def parse_field_selection(fields=None, include=None):
+    """
+    Build a FieldSelection from fields= and include= parameter values
+
+    Args:
+        fields (str, optional): Comma-separated fields
+        include (str, optional): Comma-separated sections
+
+    Returns:
+        FieldSelection: The selection, or None when neither parameter was given
+
+    Raises:
+        ValueError: If a field or section is unknown
+    """
+    if fields is None and include is None:
+        return None
+
+    persona_fields = set()
+    sections = {}
+
+    def add_section(name, field=None):
+        if field is None:
+            sections[name] = None
+        elif name not in sections or sections[name] is not None:
+            sections[name] = tuple(dict.fromkeys(sections.get(name, ()) + (field,)))
+
+    for name in _split(include):
+        if name not in SECTIONS:
+            raise ValueError(f"Invalid include: {name} (expected one of: {', '.join(SECTIONS)})")
+        add_section(name)
+
+    if fields is None:
+        persona_fields.update(PERSONA_FIELDS)
+    for name in _split(fields):
+        section, _, field = name.partition('.')
+        if not field:
+            if name in PERSONA_FIELDS:
+                persona_fields.add(name)
+            elif name in SECTIONS:
+                add_section(name)
+            else:
+                raise ValueError(f"Invalid field: {name}")
+        elif section == 'demographic':
+            if field not in DEMOGRAPHIC_FIELDS:
+                raise ValueError(f"Invalid field: {name}")
+            add_section(section, field)
+        elif section in CATEGORIES:
+            add_section(section, field)
+        else:
+            raise ValueError(f"Invalid field: {name}")
+
+    return FieldSelection(persona_fields, sections)
+
+def _split(value):
+    """Non-empty, stripped items of a comma-separated parameter"""
+    if not value:
+        return []
+    return [item.strip() for item in value.split(',') if item.strip()]
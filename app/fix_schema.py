@@ -3,14 +3,13 @@
 Script to fix the Persona API server schema issue
 """
 import json
-from sqlalchemy.orm import Session
-from sqlalchemy import create_engine
-from app.config import SQLALCHEMY_DATABASE_URI
+from sqlalchemy.orm import sessionmaker
+from app.database import get_engine
 from app.models import Persona
 from app.schemas import persona_schema
 
 # Database session
-engine = create_engine(SQLALCHEMY_DATABASE_URI)
+engine = get_engine()
 Session = sessionmaker(bind=engine)
 
 def verify_schema():
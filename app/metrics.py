@@ -0,0 +1,299 @@
+"""
+Request, database, cache and pool metrics in the Prometheus text format
+"""
+import bisect
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from flask import Response, g, request
+from sqlalchemy import event
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Upper bounds in seconds of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    'persona_http_requests_total': ('counter', 'HTTP requests by route, method and status'),
+    'persona_http_request_errors_total': ('counter', 'HTTP requests that ended in a 5xx response'),
+    'persona_http_request_duration_seconds': ('histogram', 'HTTP request latency'),
+    'persona_db_statements_total': ('counter', 'SQL statements executed while handling requests'),
+    'persona_db_seconds_total': ('counter', 'Time spent executing SQL while handling requests'),
+    'persona_cache_hits_total': ('counter', 'Persona cache hits'),
+    'persona_cache_misses_total': ('counter', 'Persona cache misses'),
+    'persona_cache_evictions_total': ('counter', 'Persona cache entries evicted for space'),
+    'persona_cache_invalidations_total': ('counter', 'Persona cache entries dropped after writes'),
+    'persona_cache_entries': ('gauge', 'Persona cache entries'),
+    'persona_db_pool_checkouts_total': ('counter', 'Connection pool checkouts'),
+    'persona_db_pool_checkout_wait_seconds_total': ('counter', 'Time spent waiting for pool connections'),
+    'persona_db_pool_checkout_timeouts_total': ('counter', 'Pool checkouts that timed out'),
+    'persona_db_pool_checked_out': ('gauge', 'Pool connections in use'),
+    'persona_db_pool_overflow': ('gauge', 'Pool connections open beyond the pool size'),
+}
+
+class Metrics:
+    """
+    Per-process request metrics, optionally shared between worker processes
+
+    Each process counts requests, latencies and SQL work in memory. When a
+    metrics directory is configured (METRICS_DIR), every process also writes
+    a snapshot of its counters to <dir>/<pid>.json at most once per
+    METRICS_FLUSH_SECONDS, and /metrics adds up the snapshots of all workers,
+    so any worker can answer a scrape. Counters of workers that exited are
+    kept so totals never go backwards; their gauges are dropped. Clear the
+    directory before starting the server.
+    """
+
+    def __init__(self):
+        """Initialize empty metrics"""
+        self.directory = None
+        self.flush_seconds = 1.0
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        # Context-local rather than thread-local, so requests sharing a thread in
+        # the ASGI mode's greenlets keep their SQL totals apart
+        self._current = contextvars.ContextVar('metrics_current', default=None)
+        self._last_flush = 0.0
+        if hasattr(os, 'register_at_fork'):
+            # A forked worker starts from zero instead of repeating the parent's counts
+            os.register_at_fork(after_in_child=self._reset)
+
+    def init_app(self, app, engines=()):
+        """Register the request hooks, SQL listeners on engines and the /metrics route"""
+        self.directory = app.config.get('METRICS_DIR') or None
+        self.flush_seconds = app.config.get('METRICS_FLUSH_SECONDS', self.flush_seconds)
+        self._reset()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+
+    def _reset(self):
+        """Drop all recorded requests"""
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """Note when a statement starts"""
+        conn.info.setdefault('metrics_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """Add a finished statement to the current request's totals"""
+        started = conn.info['metrics_started'].pop()
+        current = self._current.get()
+        if current is not None:
+            current[0] += 1
+            current[1] += time.perf_counter() - started
+
+    def _before_request(self):
+        """Start timing a request"""
+        g.metrics_started = time.perf_counter()
+        # [statements, seconds] of SQL run for the request
+        self._current.set([0, 0.0])
+
+    def _after_request(self, response):
+        """Record a finished request"""
+        started = g.pop('metrics_started', None)
+        current = self._current.get()
+        self._current.set(None)
+        if started is None:
+            return response
+
+        # The rule, not the path, so /personas/1 and /personas/2 share a series
+        route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        method = request.method
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._inc('persona_http_requests_total', (('method', method), ('route', route),
+                                                      ('status', str(response.status_code))))
+            if response.status_code >= 500:
+                self._inc('persona_http_request_errors_total', (('method', method), ('route', route)))
+            self._observe('persona_http_request_duration_seconds', (('method', method), ('route', route)),
+                          elapsed)
+            if current is not None:
+                self._inc('persona_db_statements_total', (('route', route),), current[0])
+                self._inc('persona_db_seconds_total', (('route', route),), current[1])
+        self._maybe_flush()
+        return response
+
+    def _teardown_request(self, exc):
+        """Drop per-request state left by requests that failed before after_request"""
+        self._current.set(None)
+
+    def _inc(self, name, labels, amount=1):
+        """Add to a counter; the caller holds the lock"""
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + amount
+
+    def _observe(self, name, labels, value):
+        """Add an observation to a histogram; the caller holds the lock"""
+        series = self._histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0]
+        histogram[0][bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        histogram[1] += value
+
+    def snapshot(self):
+        """
+        Return this process's metrics, including cache and pool statistics
+
+        Returns:
+            dict: pid, counters, histograms and gauges as JSON-compatible lists
+        """
+        from app.database import pool_stats
+        from app.extensions import db, persona_cache
+
+        with self._lock:
+            counters = {name: [[list(map(list, labels)), value] for labels, value in series.items()]
+                        for name, series in self._counters.items()}
+            histograms = {name: [[list(map(list, labels)), list(buckets), total]
+                                 for labels, (buckets, total) in series.items()]
+                          for name, series in self._histograms.items()}
+
+        cache = persona_cache.stats()
+        for key in ('hits', 'misses', 'evictions', 'invalidations'):
+            counters[f'persona_cache_{key}_total'] = [[[], cache[key]]]
+        gauges = {'persona_cache_entries': [[[], cache['size']]]}
+
+        try:
+            pool = pool_stats(db.engine)
+        except RuntimeError:
+            # No application context
+            pool = {}
+        for key, name in (('checkouts', 'persona_db_pool_checkouts_total'),
+                          ('checkout_wait_seconds_total', 'persona_db_pool_checkout_wait_seconds_total'),
+                          ('checkout_timeouts', 'persona_db_pool_checkout_timeouts_total')):
+            if key in pool:
+                counters[name] = [[[], pool[key]]]
+        for key, name in (('checked_out', 'persona_db_pool_checked_out'),
+                          ('overflow', 'persona_db_pool_overflow')):
+            if key in pool:
+                gauges[name] = [[[], pool[key]]]
+
+        return {'pid': os.getpid(), 'counters': counters, 'histograms': histograms, 'gauges': gauges}
+
+    def _maybe_flush(self):
+        """Write this process's snapshot if the flush interval has passed"""
+        if not self.directory:
+            return
+        now = time.monotonic()
+        if now - self._last_flush < self.flush_seconds:
+            return
+        self._last_flush = now
+        self.flush()
+
+    def flush(self):
+        """Write this process's snapshot to the metrics directory"""
+        if not self.directory:
+            return
+        snapshot = self.snapshot()
+        path = os.path.join(self.directory, f"{snapshot['pid']}.json")
+        # Write then rename, so readers never see a partial file
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as file:
+            json.dump(snapshot, file)
+        os.replace(temp_path, path)
+
+    def _snapshots(self):
+        """This process's live snapshot plus the saved snapshots of the other workers"""
+        own = self.snapshot()
+        snapshots = [own]
+        if not self.directory:
+            return snapshots
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json') or filename == f"{own['pid']}.json":
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as file:
+                    snapshot = json.load(file)
+            except (OSError, ValueError):
+                continue
+            if not _process_alive(snapshot.get('pid')):
+                snapshot['gauges'] = {}
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self):
+        """Render the metrics of all workers in the Prometheus text format"""
+        counters = {}
+        histograms = {}
+        gauges = {}
+        for snapshot in self._snapshots():
+            for name, series in snapshot['counters'].items():
+                totals = counters.setdefault(name, {})
+                for labels, value in series:
+                    key = tuple(map(tuple, labels))
+                    totals[key] = totals.get(key, 0) + value
+            for name, series in snapshot['histograms'].items():
+                totals = histograms.setdefault(name, {})
+                for labels, buckets, total in series:
+                    key = tuple(map(tuple, labels))
+                    if key not in totals:
+                        totals[key] = [[0] * len(buckets), 0.0]
+                    totals[key][0] = [a + b for a, b in zip(totals[key][0], buckets)]
+                    totals[key][1] += total
+            for name, series in snapshot['gauges'].items():
+                # Gauges are per process, so keep them apart by pid
+                values = gauges.setdefault(name, {})
+                for labels, value in series:
+                    values[tuple(map(tuple, labels)) + (('pid', str(snapshot['pid'])),)] = value
+
+        lines = []
+        for name in sorted(set(counters) | set(histograms) | set(gauges)):
+            metric_type, help_text = HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for labels, value in sorted(counters.get(name, {}).items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for labels, value in sorted(gauges.get(name, {}).items()):
+                lines.append(f'{name}{_format_labels(labels)} {_format_value(value)}')
+            for labels, (buckets, total) in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + (float('inf'),), buckets):
+                    cumulative += count
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{name}_bucket{_format_labels(labels + (("le", le),))} {cumulative}')
+                lines.append(f'{name}_sum{_format_labels(labels)} {_format_value(total)}')
+                lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+    def _metrics_view(self):
+        """Serve the metrics of all workers"""
+        return Response(self.render(), content_type=CONTENT_TYPE)
+
+def _process_alive(pid):
+    """Whether a process with this pid is running"""
+    try:
+        os.kill(int(pid), 0)
+    except (OSError, TypeError, ValueError):
+        return False
+    return True
+
+def _escape(value):
+    """Escape a label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    """Format label pairs as {name="value",...}"""
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels) + '}'
+
+def _format_value(value):
+    """Format a sample value"""
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
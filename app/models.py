@@ -2,8 +2,9 @@
 Database models for the Persona Service
 """
 from datetime import datetime
-import json
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Enum, create_engine
+import zlib
+from app import codec, storage
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Enum, Index, LargeBinary, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship, sessionmaker
 import enum
@@ -19,6 +20,10 @@ class AttributeCategory(enum.Enum):
 class Persona(Base):
     """Persona model representing a user profile"""
     __tablename__ = 'personas'
+    __table_args__ = (
+        # Matches the list ordering so keyset pagination is an index range scan
+        Index('ix_personas_updated_at_id', 'updated_at', 'id'),
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=False)
@@ -33,8 +38,19 @@ class Persona(Base):
     attributes = relationship("PersonaAttributes", back_populates="persona",
                            cascade="all, delete-orphan")
 
-    def to_dict(self):
-        """Convert persona to dictionary representation"""
+    # Index entries for list-valued attribute fields (maintained by PersonaService)
+    attribute_values = relationship("PersonaAttributeValue", cascade="all, delete-orphan")
+
+    def to_dict(self, selection=None):
+        """
+        Convert persona to dictionary representation
+
+        With a FieldSelection (see app/fieldsets.py), only the selected parts
+        are returned; the persona should have been loaded with its load_options.
+        """
+        if selection is not None:
+            return selection.serialize(self)
+
         result = {
             'id': self.id,
             'name': self.name,
@@ -74,6 +90,18 @@ class Persona(Base):
 class DemographicData(Base):
     """Demographic data associated with a persona"""
     __tablename__ = 'demographic_data'
+    __table_args__ = (
+        # Relationship loading and joins from personas
+        Index('ix_demographic_persona', 'persona_id'),
+        # List filters: country, optionally narrowed by gender and an age range
+        Index('ix_demographic_country_gender_age', 'country', 'gender', 'age'),
+        Index('ix_demographic_country_city', 'country', 'city'),
+        # Age range and language filters without a country, and sorting by age
+        Index('ix_demographic_age', 'age'),
+        Index('ix_demographic_language', 'language'),
+        # Bounding-box prefilter for nearest-persona and radius queries
+        Index('ix_demographic_lat_lng', 'latitude', 'longitude'),
+    )
 
     id = Column(Integer, primary_key=True)
     persona_id = Column(Integer, ForeignKey('personas.id', ondelete='CASCADE'), nullable=False)
@@ -113,11 +141,16 @@ class DemographicData(Base):
 class PersonaAttributes(Base):
     """Dynamic attributes for a persona (psychographic behavioral contextual)"""
     __tablename__ = 'persona_attributes'
+    __table_args__ = (
+        Index('ix_persona_attributes_persona', 'persona_id', 'category'),
+    )
 
     id = Column(Integer, primary_key=True)
     persona_id = Column(Integer, ForeignKey('personas.id', ondelete='CASCADE'), nullable=False)
     category = Column(Enum(AttributeCategory), nullable=False)
-    data = Column(Text, nullable=False, default='{}')  # JSON text blob
+    data = Column(Text, nullable=False, default='{}')  # JSON text blob (encoding 'json')
+    encoding = Column(String, nullable=False, default=storage.JSON, server_default=storage.JSON)
+    packed = Column(LargeBinary, nullable=True)  # Compressed blob (other encodings)
 
     # Relationship
     persona = relationship("Persona", back_populates="attributes")
@@ -141,45 +174,59 @@ class PersonaAttributes(Base):
             self.category = category
 
         # Handle data initialization
-        if data is None:
-            self.data = '{}'
-        elif isinstance(data, str):
-            # Validate it's a JSON string
+        self.set_data({} if data is None else data)
+
+    def _decoded_data(self):
+        """
+        Return the decoded data dictionary, decoding the stored value at most once
+
+        The result is memoized against the exact stored text or blob it was
+        decoded from, so it is recomputed after set_data or when the row is
+        reloaded. Callers must not modify it; get_data returns a copy.
+        """
+        encoding = self.encoding
+        raw = self.data if encoding in (None, storage.JSON) else self.packed
+        memo = self.__dict__.get('_decoded')
+        if memo is None or memo[0] is not raw:
             try:
-                json.loads(data)
-                self.data = data
-            except json.JSONDecodeError:
-                raise ValueError("Invalid JSON data")
-        elif isinstance(data, dict):
-            self.data = json.dumps(data)
-        else:
-            raise TypeError("Data must be a dictionary or JSON string")
+                decoded = storage.decode(encoding, self.data, self.packed)
+            except (TypeError, ValueError, zlib.error):
+                decoded = {}
+            if not isinstance(decoded, dict):
+                decoded = {}
+            memo = (raw, decoded)
+            self._decoded = memo
+        return memo[1]
 
     def get_data(self):
         """Get data as a Python dictionary"""
-        try:
-            return json.loads(self.data)
-        except json.JSONDecodeError:
-            return {}
+        return dict(self._decoded_data())
 
     def set_data(self, data):
-        """Set data from a Python dictionary"""
+        """Set data from a Python dictionary, stored in the configured storage format"""
         if isinstance(data, dict):
-            self.data = json.dumps(data)
+            decoded = dict(data)
+            self.encoding, self.data, self.packed = storage.encode(decoded)
         elif isinstance(data, str):
             try:
                 # Validate it's a proper JSON string
-                json.loads(data)
-                self.data = data
-            except json.JSONDecodeError:
+                decoded = codec.loads(data)
+            except ValueError:
                 raise ValueError("Invalid JSON data")
+            if not isinstance(decoded, dict):
+                decoded = {}
+            if storage.write_format() == storage.JSON:
+                self.encoding, self.data, self.packed = storage.JSON, data, None
+            else:
+                self.encoding, self.data, self.packed = storage.encode(decoded)
         else:
             raise TypeError("Data must be a dictionary or JSON string")
+        raw = self.data if self.encoding == storage.JSON else self.packed
+        self._decoded = (raw, decoded)
 
     def get_value(self, field_name):
         """Get a specific field value from the data"""
-        data_dict = self.get_data()
-        return data_dict.get(field_name)
+        return self._decoded_data().get(field_name)
 
     def set_value(self, field_name, value):
         """Set a specific field value in the data"""
@@ -191,10 +238,55 @@ class PersonaAttributes(Base):
         """Convert to dictionary representation"""
         return self.get_data()
 
+class PersonaAttributeValue(Base):
+    """Inverted index entry: one value of a list-valued attribute field of a persona"""
+    __tablename__ = 'persona_attribute_values'
+    __table_args__ = (
+        # Answers "which personas have value V in category.field" from the index alone
+        Index('ix_attribute_values_lookup', 'category', 'field', 'value', 'persona_id'),
+        Index('ix_attribute_values_persona', 'persona_id', 'category'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    persona_id = Column(Integer, ForeignKey('personas.id', ondelete='CASCADE'), nullable=False)
+    category = Column(Enum(AttributeCategory), nullable=False)
+    field = Column(String, nullable=False)
+    value = Column(String, nullable=False)
+
+def ensure_columns(engine):
+    """Add columns declared on the models that are missing from existing tables"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                ddl = f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'
+                if column.server_default is not None:
+                    ddl += f" NOT NULL DEFAULT '{column.server_default.arg}'"
+                connection.execute(text(ddl))
+
+def ensure_indexes(engine):
+    """Create indexes declared on the models that are missing from existing tables"""
+    existing_tables = set(inspect(engine).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
 def init_db(db_uri=None):
     """Initialize the database and create tables"""
     from app.config import SQLALCHEMY_DATABASE_URI
-    engine = create_engine(db_uri or SQLALCHEMY_DATABASE_URI)
+    from app.database import get_engine
+    engine = get_engine(db_uri or SQLALCHEMY_DATABASE_URI)
     Base.metadata.create_all(engine)
+    ensure_columns(engine)
+    ensure_indexes(engine)
     Session = sessionmaker(bind=engine)
     return Session()
@@ -0,0 +1,165 @@
+"""
+Opt-in per-request profiling and a slow-query log
+"""
+import contextvars
+import cProfile
+import io
+import logging
+import os
+import pstats
+import threading
+import time
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('app.slow_query')
+
+# Longest parameter repr written to the slow-query log
+MAX_PARAMETERS_LENGTH = 1000
+
+def _function_key(function):
+    """pstats key of a Python function"""
+    code = function.__code__
+    return (code.co_filename, code.co_firstlineno, code.co_name)
+
+def _request_label():
+    """Method and route of the current request, for log lines"""
+    if not has_request_context():
+        return 'no request'
+    route = request.url_rule.rule if request.url_rule is not None else request.path
+    return f'{request.method} {route}'
+
+class RequestProfiler:
+    """
+    Profiles single requests on demand and logs slow SQL statements
+
+    With PROFILING_ENABLED set, a request carrying the PROFILING_HEADER
+    header is run under cProfile, and every SQL statement it executes is
+    timed. The response gets a Server-Timing header splitting the time into
+    SQL, Persona.to_dict and JSON encoding, and a report with the slowest
+    functions and the statements is logged. With PROFILING_DIR set, the raw
+    profile is also saved there for tools such as snakeviz. Only one request
+    per process is profiled at a time.
+
+    With SLOW_QUERY_THRESHOLD_MS set, statements taking at least that long
+    are logged with their parameters and the route that ran them. Neither
+    feature registers any hook when it is off.
+
+    In the ASGI mode requests share a thread, so a profile also covers
+    whatever other requests ran while the profiled one waited on the
+    database; the SQL statements listed are still only its own.
+    """
+
+    def __init__(self):
+        """Initialize with profiling and the slow-query log off"""
+        self.enabled = False
+        self.header = 'X-Profile'
+        self.directory = None
+        self.top = 25
+        self.slow_query_seconds = None
+        self._active = threading.Lock()
+        self._statements = contextvars.ContextVar('profiling_statements', default=None)
+
+    def init_app(self, app, engines=()):
+        """Register the hooks and SQL listeners the configuration asks for"""
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        self.header = app.config.get('PROFILING_HEADER', self.header)
+        self.directory = app.config.get('PROFILING_DIR') or None
+        self.top = app.config.get('PROFILING_TOP_FUNCTIONS', self.top)
+        threshold_ms = app.config.get('SLOW_QUERY_THRESHOLD_MS')
+        self.slow_query_seconds = threshold_ms / 1000.0 if threshold_ms else None
+
+        if not self.enabled and self.slow_query_seconds is None:
+            return
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+        if self.enabled:
+            if self.directory:
+                os.makedirs(self.directory, exist_ok=True)
+            app.before_request(self._start_profile)
+            app.after_request(self._finish_profile)
+            app.teardown_request(self._discard_profile)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """Note when a statement starts"""
+        conn.info.setdefault('profiling_started', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        """Record the statement for a profiled request and log it if slow"""
+        elapsed = time.perf_counter() - conn.info['profiling_started'].pop()
+        statements = self._statements.get()
+        if statements is not None:
+            statements.append((elapsed, statement))
+        if self.slow_query_seconds is not None and elapsed >= self.slow_query_seconds:
+            parameters_repr = repr(parameters)
+            if len(parameters_repr) > MAX_PARAMETERS_LENGTH:
+                parameters_repr = parameters_repr[:MAX_PARAMETERS_LENGTH] + '...'
+            slow_query_logger.warning("Slow query (%.1f ms) in %s: %s; parameters: %s",
+                                      elapsed * 1000, _request_label(), ' '.join(statement.split()),
+                                      parameters_repr)
+
+    def _start_profile(self):
+        """Start profiling the request if it asks for it and no other request is profiled"""
+        if not request.headers.get(self.header):
+            return
+        if not self._active.acquire(blocking=False):
+            return
+        g.profiler = cProfile.Profile()
+        g.profile_started = time.perf_counter()
+        self._statements.set([])
+        g.profiler.enable()
+
+    def _finish_profile(self, response):
+        """Stop profiling, add Server-Timing to the response and log the report"""
+        profiler = g.pop('profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        total = time.perf_counter() - g.pop('profile_started')
+        statements = self._statements.get()
+        self._statements.set(None)
+        self._active.release()
+
+        from app.codec import CodecJSONProvider
+        from app.models import Persona
+        stats = pstats.Stats(profiler)
+        sql_seconds = sum(elapsed for elapsed, _ in statements)
+        to_dict_seconds = self._cumulative(stats, Persona.to_dict)
+        encode_seconds = self._cumulative(stats, CodecJSONProvider.dumps)
+
+        response.headers['Server-Timing'] = ', '.join([
+            f'sql;dur={sql_seconds * 1000:.1f};desc="{len(statements)} statements"',
+            f'to_dict;dur={to_dict_seconds * 1000:.1f}',
+            f'encode;dur={encode_seconds * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+        report = io.StringIO()
+        report.write(f"Profile of {_request_label()} ({request.full_path}): {total * 1000:.1f} ms total, "
+                     f"{sql_seconds * 1000:.1f} ms in {len(statements)} SQL statements\n")
+        for elapsed, statement in statements:
+            report.write(f"  {elapsed * 1000:8.2f} ms  {' '.join(statement.split())}\n")
+        stats.stream = report
+        stats.sort_stats('cumulative').print_stats(self.top)
+        logger.info(report.getvalue())
+
+        if self.directory:
+            filename = f"{time.strftime('%Y%m%d-%H%M%S')}-{request.method}-{request.path.strip('/').replace('/', '_')}.prof"
+            profiler.dump_stats(os.path.join(self.directory, filename))
+        return response
+
+    def _discard_profile(self, exc):
+        """Release the profiler of a request that failed before after_request"""
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            self._statements.set(None)
+            self._active.release()
+
+    @staticmethod
+    def _cumulative(stats, function):
+        """Cumulative seconds spent in function according to stats"""
+        entry = stats.stats.get(_function_key(function))
+        return entry[3] if entry is not None else 0.0
@@ -1,12 +1,20 @@
 """
 API routes for persona service with dynamic field support
 """
+import hashlib
 import json
 import logging
-from flask import Blueprint, jsonify, request, current_app
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from flask import Blueprint, Response, g, jsonify, request, current_app, stream_with_context
 from http import HTTPStatus
-from app.services import PersonaService
-from app.extensions import db  # Import db from extensions
+from sqlalchemy.orm import Session
+from app import codec
+from app.services import PersonaService, DEMOGRAPHIC_FILTER_FIELDS
+from app.extensions import db, persona_cache  # Import db from extensions
+from app.database import pool_stats
+from app.fieldsets import parse_field_selection
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,64 +29,429 @@ def get_db_session():
     if db.session is None:
         # If db.session is None log error and try to reinitialize
         logger.error("Database session is None. Trying to reinitialize...")
-        from app.config import SQLALCHEMY_DATABASE_URI
-        from sqlalchemy import create_engine
         from sqlalchemy.orm import sessionmaker, scoped_session
+        from app.database import get_engine
 
         try:
-            engine = create_engine(SQLALCHEMY_DATABASE_URI)
+            # Reuse the process-wide engine rather than building a new pool per request
+            engine = get_engine(current_app.config.get('SQLALCHEMY_DATABASE_URI'))
             session_factory = sessionmaker(bind=engine)
             session = scoped_session(session_factory)
             db.session = session
-            db.engine = engine
             logger.info("Database session reinitialized successfully")
         except Exception as e:
             logger.error(f"Failed to reinitialize database session: {str(e)}")
 
     return db.session
 
+REPLICA_STICKY_COOKIE = 'persona_read_primary_until'
+WRITE_METHODS = frozenset(['POST', 'PUT', 'PATCH', 'DELETE'])
+
+def read_from_primary():
+    """Whether this client wrote recently enough that replica reads could miss its writes"""
+    try:
+        return float(request.cookies.get(REPLICA_STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def get_replica_session():
+    """Get a session on the read replica for this request, or None to read from the primary"""
+    if 'replica' not in current_app.config.get('SQLALCHEMY_BINDS', {}) or read_from_primary():
+        return None
+    if 'replica_session' not in g:
+        g.replica_session = Session(bind=db.engines['replica'])
+    return g.replica_session
+
+def get_persona_service():
+    """
+    Get a PersonaService for the current request
+
+    Reads go to the read replica when one is configured, unless the client
+    wrote recently. Once the service commits a write it reads from the
+    primary, so later reads in the same request see that write.
+    """
+    return PersonaService(
+        get_db_session(),
+        allow_unknown_fields=current_app.config.get('ALLOW_UNKNOWN_FIELDS', True),
+        read_session=get_replica_session()
+    )
+
+@api_bp.after_request
+def mark_client_writes(response):
+    """After a successful write, pin the client's reads to the primary for a while"""
+    if (request.method in WRITE_METHODS and response.status_code < 400
+            and 'replica' in current_app.config.get('SQLALCHEMY_BINDS', {})):
+        sticky_seconds = current_app.config.get('REPLICA_STICKY_SECONDS', 5.0)
+        response.set_cookie(REPLICA_STICKY_COOKIE, f'{time.time() + sticky_seconds:.3f}',
+                            max_age=max(1, math.ceil(sticky_seconds)), httponly=True, samesite='Lax')
+    return response
+
+@api_bp.teardown_request
+def close_replica_session(exc):
+    """Close the request's read replica session"""
+    replica_session = g.pop('replica_session', None)
+    if replica_session is not None:
+        replica_session.close()
+
+def get_field_selection():
+    """Parse the request's fields= and include= parameters; None returns personas in full"""
+    return parse_field_selection(request.args.get('fields'), request.args.get('include'))
+
+def selection_variant(selection):
+    """ETag suffix telling a narrowed representation from the full one"""
+    return f"f{selection.key}" if selection is not None else None
+
+def validate_persona_categories(service, data):
+    """Validate every attribute category present in a persona payload, returning an error response or None"""
+    categories = [category for category in ['psychographic', 'behavioral', 'contextual'] if category in data]
+    results = service.validate_category_batch([(category, data[category]) for category in categories])
+    for category, (is_valid, error) in zip(categories, results):
+        if not is_valid:
+            return jsonify({'error': f'Invalid {category} data', 'details': error}), HTTPStatus.BAD_REQUEST
+    return None
+
 @api_bp.route('/personas', methods=['GET'])
 def get_personas():
-    """Get all personas with pagination"""
+    """
+    Get all personas with pagination
+
+    Pass cursor (empty for the first page, then the previous next_cursor) for
+    keyset pagination; otherwise page selects an offset page. The total is
+    included by default for offset pages only and can be toggled with
+    include_total.
+
+    List-valued attribute fields can be filtered on with <category>.<field>=<value>
+    parameters (repeat a parameter for several values), combined with
+    match=all (default) or match=any.
+
+    Demographic filters: country, city, region, language, gender, education,
+    income and occupation (repeat for any of several values), age_min and
+    age_max. sort takes updated_at, created_at, name, age, country or city,
+    prefixed with '-' for descending order (default -updated_at).
+
+    ids (comma-separated or repeated) fetches those personas instead, as
+    POST /personas:batchGet does; the other parameters are then ignored.
+
+    fields and include narrow what is loaded and returned (see
+    app/fieldsets.py).
+    """
+    try:
+        selection = get_field_selection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+
+    if 'ids' in request.args:
+        try:
+            persona_ids = parse_persona_ids(
+                [part for value in request.args.getlist('ids') for part in value.split(',') if part.strip()]
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+        return batch_get_response(persona_ids, selection)
+
     # Parse pagination parameters
     page = request.args.get('page', 1, type=int)
     per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')
+    default_include_total = 'false' if cursor is not None else 'true'
+    include_total = request.args.get('include_total', default_include_total).lower() in ('1', 'true', 'yes')
+    match = request.args.get('match', 'all')
+    filters = [
+        (key.split('.', 1)[0], key.split('.', 1)[1], value)
+        for key in request.args
+        if key.split('.', 1)[0] in ['psychographic', 'behavioral', 'contextual'] and '.' in key
+        for value in request.args.getlist(key)
+    ]
+    demographic_filters = {
+        field: request.args.getlist(field)
+        for field in DEMOGRAPHIC_FILTER_FIELDS
+        if field in request.args
+    }
+    for bound in ['age_min', 'age_max']:
+        if bound in request.args:
+            value = request.args.get(bound, type=int)
+            if value is None:
+                return jsonify({'error': f'{bound} must be an integer'}), HTTPStatus.BAD_REQUEST
+            demographic_filters[bound] = value
+    sort = request.args.get('sort')
+
+    if page < 1 or per_page < 1:
+        return jsonify({'error': 'page and per_page must be positive'}), HTTPStatus.BAD_REQUEST
 
     # Get personas from service
     try:
-        service = PersonaService(get_db_session())
-        result = service.get_all_personas(page=page, per_page=per_page)
+        service = get_persona_service()
+        try:
+            result = service.get_all_personas(page=page, per_page=per_page, cursor=cursor,
+                                              include_total=include_total, filters=filters,
+                                              match=match, demographic_filters=demographic_filters,
+                                              sort=sort, selection=selection)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+
+        # The page's ETag covers which personas it holds and their versions,
+        # so an unchanged page is answered before anything is serialized
+        fingerprint = hashlib.sha1(repr((
+            [(persona.id, persona.updated_at) for persona in result['personas']],
+            result['total'], result['next_cursor'], selection_variant(selection)
+        )).encode()).hexdigest()
+        if is_not_modified(fingerprint):
+            return not_modified(fingerprint)
 
         # Convert personas to dictionaries
         personas_dict = []
         for persona in result['personas']:
             try:
-                personas_dict.append(persona.to_dict())
+                personas_dict.append(persona.to_dict(selection))
             except Exception as e:
                 logger.error(f"Error serializing persona {persona.id}: {str(e)}")
 
-        return jsonify({
+        response = {
             'personas': personas_dict,
-            'total': result['total'],
-            'page': result['page'],
             'per_page': result['per_page'],
-            'pages': (result['total'] + per_page - 1) // per_page
-        }), HTTPStatus.OK
+            'next_cursor': result['next_cursor']
+        }
+        if cursor is None:
+            response['page'] = result['page']
+        if include_total:
+            response['total'] = result['total']
+            if cursor is None:
+                response['pages'] = (result['total'] + per_page - 1) // per_page
+
+        return with_validators(jsonify(response), fingerprint), HTTPStatus.OK
     except Exception as e:
         logger.error(f"Error getting personas: {str(e)}")
         return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
+@api_bp.route('/personas:batchGet', methods=['POST'])
+def batch_get_personas():
+    """
+    Get many personas by ID in one request
+
+    Accepts {"ids": [...]} (or a bare JSON array). Personas come back in the
+    order asked for, and IDs that do not exist are listed under missing.
+    fields and include query parameters narrow the personas returned.
+    """
+    try:
+        selection = get_field_selection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('ids')
+    if not isinstance(data, list):
+        return jsonify({'error': 'A list of ids is required'}), HTTPStatus.BAD_REQUEST
+    try:
+        persona_ids = parse_persona_ids(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+    return batch_get_response(persona_ids, selection)
+
+def parse_persona_ids(values):
+    """Validate a batch of persona IDs, raising ValueError with a client-facing message"""
+    if not values:
+        raise ValueError('At least one id is required')
+    max_ids = current_app.config.get('BATCH_GET_MAX_IDS', 1000)
+    if len(values) > max_ids:
+        raise ValueError(f'At most {max_ids} ids can be fetched per request')
+    persona_ids = []
+    for value in values:
+        # int() would accept True and truncate 1.5, neither of which is an id
+        if isinstance(value, (bool, float)):
+            raise ValueError(f'Invalid id: {value}')
+        try:
+            persona_ids.append(int(value.strip() if isinstance(value, str) else value))
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid id: {value}')
+    return persona_ids
+
+def batch_get_response(persona_ids, selection=None):
+    """
+    Build the response of a batch GET
+
+    The body is assembled from the personas' serialized JSON, so cached
+    personas are sent without being decoded or re-encoded. The ETag covers
+    the personas' versions, the missing IDs and the field selection.
+    """
+    try:
+        service = get_persona_service()
+        found, missing = service.get_serialized_personas(persona_ids, current_app.json.dumps, selection)
+
+        fingerprint = hashlib.sha1(repr((
+            [(persona_id, cached.updated_at) for persona_id, cached in found], missing,
+            selection_variant(selection)
+        )).encode()).hexdigest()
+        if is_not_modified(fingerprint):
+            return not_modified(fingerprint)
+
+        # Keys in sorted order, as jsonify writes them
+        body = (f'{{"count":{len(found)},"missing":{current_app.json.dumps(missing)},'
+                f'"personas":[{",".join(cached.payload for _, cached in found)}]}}')
+        response = current_app.response_class(body, mimetype=current_app.json.mimetype)
+        return with_validators(response, fingerprint), HTTPStatus.OK
+    except Exception as e:
+        logger.error(f"Error batch getting personas: {str(e)}")
+        return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+def persona_etag(persona_id, updated_at, variant=None):
+    """Build a strong ETag from a persona's identity and version"""
+    etag = f"{persona_id}-{updated_at:%Y%m%d%H%M%S%f}" if updated_at else str(persona_id)
+    return f"{etag}-{variant}" if variant else etag
+
+def is_not_modified(etag, last_modified=None):
+    """Evaluate If-None-Match, or If-Modified-Since when no ETag was sent"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified and request.if_modified_since:
+        since = request.if_modified_since.replace(tzinfo=None)
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def has_conditional_headers():
+    """Whether the request carries If-None-Match or If-Modified-Since"""
+    return bool(request.if_none_match) or request.if_modified_since is not None
+
+def with_validators(response, etag, last_modified=None):
+    """Attach ETag and Last-Modified headers to a response"""
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    return response
+
+def not_modified(etag, last_modified=None):
+    """Build an empty 304 response carrying the validators"""
+    return with_validators(current_app.response_class(status=HTTPStatus.NOT_MODIFIED), etag, last_modified)
+
+def parse_timestamp(value):
+    """Parse an ISO-8601 timestamp into a naive UTC datetime as stored in the database"""
+    timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+@api_bp.route('/personas/near', methods=['GET'])
+def get_personas_near():
+    """
+    Get the personas nearest to a location
+
+    Requires lat and lng; k (default 10) limits the number of results and
+    radius_km optionally restricts them to a distance. Each persona carries
+    its distance_km from the given point.
+    """
+    lat = request.args.get('lat', type=float)
+    lng = request.args.get('lng', type=float)
+    radius_km = request.args.get('radius_km', type=float)
+    k = request.args.get('k', 10, type=int)
+    max_results = current_app.config.get('NEAR_MAX_RESULTS', 1000)
+
+    if lat is None or lng is None:
+        return jsonify({'error': 'lat and lng are required numbers'}), HTTPStatus.BAD_REQUEST
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({'error': 'lat must be within [-90, 90] and lng within [-180, 180]'}), HTTPStatus.BAD_REQUEST
+    if 'radius_km' in request.args and (radius_km is None or radius_km <= 0):
+        return jsonify({'error': 'radius_km must be a positive number'}), HTTPStatus.BAD_REQUEST
+    if not 1 <= k <= max_results:
+        return jsonify({'error': f'k must be between 1 and {max_results}'}), HTTPStatus.BAD_REQUEST
+
+    try:
+        service = get_persona_service()
+        results = service.find_personas_near(lat, lng, radius_km=radius_km, k=k)
+
+        personas_dict = []
+        for persona, distance in results:
+            persona_dict = persona.to_dict()
+            persona_dict['distance_km'] = round(distance, 3)
+            personas_dict.append(persona_dict)
+
+        return jsonify({'personas': personas_dict, 'count': len(personas_dict)}), HTTPStatus.OK
+    except Exception as e:
+        logger.error(f"Error finding personas near {lat},{lng}: {str(e)}")
+        return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+@api_bp.route('/personas/export', methods=['GET'])
+def export_personas():
+    """
+    Stream every persona as newline-delimited JSON
+
+    chunk_size (at most EXPORT_MAX_CHUNK_SIZE) personas are fetched and
+    written at a time, which bounds the memory an export holds.
+
+    Pass updated_since (ISO-8601) for an incremental dump. The
+    X-Export-Started-At response header holds the time the export began, and
+    X-Export-Next-Updated-Since the updated_since to pass next: the start time
+    minus EXPORT_CURSOR_OVERLAP_SECONDS. A write stamped before the export
+    began may commit after its query ran, so consecutive dumps overlap to
+    catch it, and consumers must de-duplicate records by id (keeping the
+    latest updated_at).
+    """
+    updated_since = request.args.get('updated_since')
+    chunk_size = request.args.get('chunk_size', 1000, type=int)
+    max_chunk_size = current_app.config.get('EXPORT_MAX_CHUNK_SIZE', 5000)
+
+    if updated_since:
+        try:
+            updated_since = parse_timestamp(updated_since)
+        except ValueError:
+            return jsonify({'error': f'Invalid updated_since: {updated_since}'}), HTTPStatus.BAD_REQUEST
+    if not 1 <= chunk_size <= max_chunk_size:
+        return jsonify({'error': f'chunk_size must be between 1 and {max_chunk_size}'}), HTTPStatus.BAD_REQUEST
+
+    started_at = datetime.utcnow()
+    next_updated_since = started_at - timedelta(
+        seconds=current_app.config.get('EXPORT_CURSOR_OVERLAP_SECONDS', 60.0))
+    service = get_persona_service()
+
+    def generate():
+        lines = []
+        try:
+            for persona in service.iter_personas(updated_since=updated_since or None, chunk_size=chunk_size):
+                lines.append(codec.dumps(persona.to_dict()))
+                if len(lines) >= chunk_size:
+                    yield '\n'.join(lines) + '\n'
+                    lines = []
+            if lines:
+                yield '\n'.join(lines) + '\n'
+        except Exception as e:
+            # Headers are already sent, so the truncated stream is all the client sees
+            logger.error(f"Error exporting personas: {str(e)}")
+            raise
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Export-Started-At'] = started_at.isoformat()
+    response.headers['X-Export-Next-Updated-Since'] = next_updated_since.isoformat()
+    return response
+
 @api_bp.route('/personas/<int:persona_id>', methods=['GET'])
 def get_persona(persona_id):
-    """Get a specific persona by ID"""
+    """
+    Get a specific persona by ID, answering conditional requests with 304
+
+    fields and include narrow what is loaded and returned; such responses
+    get their own ETag.
+    """
     try:
-        service = PersonaService(get_db_session())
-        persona = service.get_persona_by_id(persona_id)
+        selection = get_field_selection()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), HTTPStatus.BAD_REQUEST
+    variant = selection_variant(selection)
 
-        if not persona:
+    try:
+        service = get_persona_service()
+
+        if has_conditional_headers():
+            updated_at = service.get_persona_updated_at(persona_id)
+            etag = persona_etag(persona_id, updated_at, variant)
+            if updated_at and is_not_modified(etag, updated_at):
+                return not_modified(etag, updated_at)
+
+        cached = service.get_serialized_persona(persona_id, current_app.json.dumps, selection)
+
+        if not cached:
             return jsonify({'error': 'Persona not found'}), HTTPStatus.NOT_FOUND
 
-        return jsonify(persona.to_dict()), HTTPStatus.OK
+        response = current_app.response_class(cached.payload, mimetype=current_app.json.mimetype)
+        return with_validators(response, persona_etag(persona_id, cached.updated_at, variant),
+                               cached.updated_at), HTTPStatus.OK
     except Exception as e:
         logger.error(f"Error getting persona {persona_id}: {str(e)}")
         return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
@@ -97,12 +470,10 @@ def create_persona():
             return jsonify({'error': 'Name is required'}), HTTPStatus.BAD_REQUEST
 
         # Validate data for categories if provided
-        service = PersonaService(get_db_session())
-        for category in ['psychographic', 'behavioral', 'contextual']:
-            if category in data:
-                is_valid, error = service.validate_category_data(category, data[category])
-                if not is_valid:
-                    return jsonify({'error': f'Invalid {category} data', 'details': error}), HTTPStatus.BAD_REQUEST
+        service = get_persona_service()
+        error_response = validate_persona_categories(service, data)
+        if error_response:
+            return error_response
 
         # Create persona
         persona = service.create_persona(data)
@@ -112,6 +483,45 @@ def create_persona():
         logger.error(f"Error creating persona: {str(e)}")
         return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
+@api_bp.route('/personas/bulk', methods=['POST'])
+def bulk_create_personas():
+    """
+    Create many personas in one transaction
+
+    Accepts a JSON array of persona objects (or {"personas": [...]}). Invalid
+    items are reported by index and skipped; the rest are created together.
+    """
+    try:
+        data = request.get_json()
+        if isinstance(data, dict):
+            data = data.get('personas')
+        if not isinstance(data, list) or not data:
+            return jsonify({'error': 'A non-empty list of personas is required'}), HTTPStatus.BAD_REQUEST
+
+        max_items = current_app.config.get('BULK_CREATE_MAX_ITEMS', 10000)
+        if len(data) > max_items:
+            return jsonify({'error': f'At most {max_items} personas can be created per request'}), HTTPStatus.BAD_REQUEST
+
+        service = get_persona_service()
+        result = service.bulk_create_personas(data)
+
+        if not result['created']:
+            status = HTTPStatus.BAD_REQUEST
+        elif result['errors']:
+            status = HTTPStatus.MULTI_STATUS
+        else:
+            status = HTTPStatus.CREATED
+
+        return jsonify({
+            'created': result['created'],
+            'errors': result['errors'],
+            'created_count': len(result['created']),
+            'error_count': len(result['errors'])
+        }), status
+    except Exception as e:
+        logger.error(f"Error bulk creating personas: {str(e)}")
+        return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
 @api_bp.route('/personas/<int:persona_id>', methods=['PUT', 'PATCH'])
 def update_persona(persona_id):
     """Update a persona"""
@@ -122,12 +532,10 @@ def update_persona(persona_id):
             return jsonify({'error': 'No data provided'}), HTTPStatus.BAD_REQUEST
 
         # Validate data for categories if provided
-        service = PersonaService(get_db_session())
-        for category in ['psychographic', 'behavioral', 'contextual']:
-            if category in data:
-                is_valid, error = service.validate_category_data(category, data[category])
-                if not is_valid:
-                    return jsonify({'error': f'Invalid {category} data', 'details': error}), HTTPStatus.BAD_REQUEST
+        service = get_persona_service()
+        error_response = validate_persona_categories(service, data)
+        if error_response:
+            return error_response
 
         # Update persona
         persona = service.update_persona(persona_id, data)
@@ -144,7 +552,7 @@ def update_persona(persona_id):
 def delete_persona(persona_id):
     """Delete a persona"""
     try:
-        service = PersonaService(get_db_session())
+        service = get_persona_service()
         result = service.delete_persona(persona_id)
 
         if not result:
@@ -162,7 +570,7 @@ def get_field_config():
         category = request.args.get('category')
         field_name = request.args.get('field')
 
-        service = PersonaService(get_db_session())
+        service = get_persona_service()
         config = service.get_field_config(category, field_name)
 
         return jsonify(config), HTTPStatus.OK
@@ -177,20 +585,33 @@ def get_persona_attributes(persona_id, category):
         if category not in ['psychographic', 'behavioral', 'contextual']:
             return jsonify({'error': f'Invalid category: {category}'}), HTTPStatus.BAD_REQUEST
 
-        service = PersonaService(get_db_session())
-        data = service.get_attribute_data(persona_id, category)
+        service = get_persona_service()
+
+        if has_conditional_headers():
+            updated_at = service.get_persona_updated_at(persona_id)
+            etag = persona_etag(persona_id, updated_at, category)
+            if updated_at and is_not_modified(etag, updated_at):
+                return not_modified(etag, updated_at)
+
+        data, updated_at = service.get_versioned_attribute_data(persona_id, category)
 
         if data is None:
             return jsonify({'error': 'Persona not found'}), HTTPStatus.NOT_FOUND
 
-        return jsonify(data), HTTPStatus.OK
+        return with_validators(jsonify(data), persona_etag(persona_id, updated_at, category), updated_at), HTTPStatus.OK
     except Exception as e:
         logger.error(f"Error getting {category} data for persona {persona_id}: {str(e)}")
         return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
 
 @api_bp.route('/personas/<int:persona_id>/attributes/<category>', methods=['PUT', 'PATCH'])
 def update_persona_attributes(persona_id, category):
-    """Update attributes for a persona by category"""
+    """
+    Update attributes for a persona by category
+
+    Both methods merge the given top-level fields into the stored data.
+    PATCH writes only those fields in place in the database, without a
+    read-modify-write of the whole blob.
+    """
     try:
         # Get request data
         data = request.get_json()
@@ -201,18 +622,32 @@ def update_persona_attributes(persona_id, category):
             return jsonify({'error': f'Invalid category: {category}'}), HTTPStatus.BAD_REQUEST
 
         # Validate data
-        service = PersonaService(get_db_session())
+        service = get_persona_service()
         is_valid, error = service.validate_category_data(category, data)
         if not is_valid:
             return jsonify({'error': f'Invalid {category} data', 'details': error}), HTTPStatus.BAD_REQUEST
 
         # Update data
-        attr = service.update_attribute_data(persona_id, category, data)
+        if request.method == 'PATCH':
+            updated = service.patch_attribute_data(persona_id, category, data)
+        else:
+            attr = service.update_attribute_data(persona_id, category, data)
+            updated = attr.get_data() if attr is not None else None
 
-        if attr is None:
+        if updated is None:
             return jsonify({'error': 'Persona not found'}), HTTPStatus.NOT_FOUND
 
-        return jsonify(attr.get_data()), HTTPStatus.OK
+        return jsonify(updated), HTTPStatus.OK
     except Exception as e:
         logger.error(f"Error updating {category} data for persona {persona_id}: {str(e)}")
         return jsonify({'error': str(e)}), HTTPStatus.INTERNAL_SERVER_ERROR
+
+@api_bp.route('/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """Get persona cache hit/miss/eviction counters for this process"""
+    return jsonify(persona_cache.stats()), HTTPStatus.OK
+
+@api_bp.route('/pool/stats', methods=['GET'])
+def get_pool_stats():
+    """Get connection pool usage and checkout wait times for this process"""
+    return jsonify(pool_stats(db.engine)), HTTPStatus.OK
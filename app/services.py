@@ -1,46 +1,565 @@
 """
 Service layer for persona operations with dynamic attribute support
 """
+import base64
 import json
+import math
 import sys
 import os
+import threading
+import time
+import zlib
 from datetime import datetime
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, delete, func, insert, or_, select, update
+from sqlalchemy.orm import Session, selectinload
 from app.models import (
     Persona, DemographicData, PersonaAttributes, 
-    AttributeCategory
+    PersonaAttributeValue, AttributeCategory
 )
+from app import codec, storage
+from app.cache import CachedPersona
+from app.extensions import persona_cache
+from app.validation import get_compiled_config
 
 # Add the parent directory to sys.path for imports
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 import persona_field_config
 
+CATEGORIES = ['psychographic', 'behavioral', 'contextual']
+
+DEMOGRAPHIC_FIELDS = ['latitude', 'longitude', 'language', 'country', 'city',
+                      'region', 'age', 'gender', 'education', 'income', 'occupation']
+
+# Accepted value types of demographic fields (None is always accepted); the
+# rest are strings. income is a band such as "High" but may be a number
+DEMOGRAPHIC_TYPES = {
+    'latitude': ((int, float), 'a number'),
+    'longitude': ((int, float), 'a number'),
+    'age': ((int,), 'an integer'),
+    'income': ((str, int, float), 'a string or a number'),
+}
+
+# Keys of Persona.to_dict() demographic output that are ignored on input
+DEMOGRAPHIC_READ_ONLY_FIELDS = ('id', 'persona_id')
+
+# Demographic columns accepted as equality filters on the persona list
+DEMOGRAPHIC_FILTER_FIELDS = ['country', 'city', 'region', 'language', 'gender',
+                             'education', 'income', 'occupation']
+
+# Sort keys accepted by get_all_personas (prefix with '-' for descending)
+SORT_COLUMNS = {
+    'updated_at': Persona.updated_at,
+    'created_at': Persona.created_at,
+    'name': Persona.name,
+    'age': DemographicData.age,
+    'country': DemographicData.country,
+    'city': DemographicData.city,
+}
+
+DEFAULT_SORT = '-updated_at'
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Half the Earth's circumference: every point is within this distance
+MAX_DISTANCE_KM = math.pi * EARTH_RADIUS_KM
+
+# Relationship loaders for reads that end in Persona.to_dict(). selectinload
+# fetches each relationship for the whole result in one "IN (...)" query, so
+# the statement count of a read does not depend on how many personas it returns.
+PERSONA_EAGER_OPTIONS = (
+    selectinload(Persona.demographic),
+    selectinload(Persona.attributes),
+)
+
+class TotalCountCache:
+    """
+    Process-local cache of the unfiltered persona count
+
+    Writes made through PersonaService invalidate it immediately; writes from
+    other processes become visible once the entry expires.
+    """
+
+    def __init__(self, ttl=5.0):
+        """Initialize with a lifetime in seconds (0 disables caching)"""
+        self.ttl = ttl
+        self._value = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return the cached count, or None when missing or expired"""
+        with self._lock:
+            if self._value is not None and time.monotonic() < self._expires_at:
+                return self._value
+        return None
+
+    def set(self, value):
+        """Store a freshly computed count"""
+        if not self.ttl:
+            return
+        with self._lock:
+            self._value = value
+            self._expires_at = time.monotonic() + self.ttl
+
+    def invalidate(self):
+        """Drop the cached count"""
+        with self._lock:
+            self._value = None
+
+total_count_cache = TotalCountCache()
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in kilometers"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+def haversine_term(lat, lng, lat_column, lng_column):
+    """
+    SQL expression for the haversine term between a point and stored coordinates
+    
+    The distance is 2 * EARTH_RADIUS_KM * asin(sqrt(term)), so ordering by
+    the term orders by distance. Uses the database's sin, cos and radians
+    functions (see app/database.py for SQLite builds without them).
+    """
+    lat_rad = math.radians(lat)
+    half_dlat = (func.radians(lat_column) - lat_rad) / 2
+    half_dlng = (func.radians(lng_column) - math.radians(lng)) / 2
+    return (func.sin(half_dlat) * func.sin(half_dlat)
+            + math.cos(lat_rad) * func.cos(func.radians(lat_column))
+            * func.sin(half_dlng) * func.sin(half_dlng))
+
+def bounding_box(lat, lng, radius_km):
+    """
+    Latitude range and longitude ranges enclosing a circle on the sphere
+    
+    Returns:
+        tuple: (min_lat, max_lat, [(min_lng, max_lng), ...]); the circle is
+        split into two longitude ranges when it crosses the antimeridian
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    min_lat = lat - math.degrees(angular)
+    max_lat = lat + math.degrees(angular)
+    if min_lat <= -90 or max_lat >= 90 or angular >= math.pi / 2:
+        # The circle contains a pole, so it spans every longitude
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+    
+    delta_lng = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(lat)))))
+    min_lng, max_lng = lng - delta_lng, lng + delta_lng
+    if min_lng < -180:
+        return min_lat, max_lat, [(min_lng + 360, 180.0), (-180.0, max_lng)]
+    if max_lng > 180:
+        return min_lat, max_lat, [(min_lng, 180.0), (-180.0, max_lng - 360)]
+    return min_lat, max_lat, [(min_lng, max_lng)]
+
+def encode_cursor(persona):
+    """Encode the list position after a persona as an opaque cursor token"""
+    position = [persona.updated_at.isoformat(), persona.id]
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor token into (updated_at, id), raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        updated_at, persona_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(updated_at), int(persona_id)
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+def validate_persona_shape(persona_data):
+    """
+    Check the name and demographic data of a persona payload
+    
+    Attribute categories are checked separately against the field
+    configuration (see validate_category_data).
+    
+    Returns:
+        tuple: (is_valid, error) where error is None, a message, or a list of messages
+    """
+    if not isinstance(persona_data, dict):
+        return False, "Persona must be an object"
+    if 'name' not in persona_data:
+        return False, "Name is required"
+    name = persona_data['name']
+    if not isinstance(name, str) or not name.strip():
+        return False, "Name must be a non-empty string"
+    
+    demographic = persona_data.get('demographic')
+    if demographic is None:
+        return True, None
+    if not isinstance(demographic, dict):
+        return False, "Demographic data must be an object"
+    errors = []
+    for field, value in demographic.items():
+        if field in DEMOGRAPHIC_READ_ONLY_FIELDS:
+            continue
+        if field not in DEMOGRAPHIC_FIELDS:
+            errors.append(f"Unknown demographic field: {field}")
+            continue
+        types, description = DEMOGRAPHIC_TYPES.get(field, ((str,), 'a string'))
+        # bool is an int subclass but never a valid age or coordinate
+        if value is not None and (isinstance(value, bool) or not isinstance(value, types)):
+            errors.append(f"Demographic field '{field}' must be {description}")
+    if errors:
+        return False, errors
+    return True, None
+
 class PersonaService:
     """Service class for persona operations"""
     
-    def __init__(self, session: Session):
-        """Initialize with database session"""
+    def __init__(self, session: Session, allow_unknown_fields=True, read_session: Session = None):
+        """
+        Initialize with database session
+        
+        Read methods use read_session (e.g. bound to a read replica) until
+        this service commits a write; from then on they read from session,
+        so a caller always sees its own writes.
+        
+        Args:
+            session (Session): Database session for writes
+            allow_unknown_fields (bool): Accept attribute fields missing from the field configuration
+            read_session (Session, optional): Database session for reads (default: session)
+        """
         self.session = session
+        self.read_session = read_session if read_session is not None else session
+        self.allow_unknown_fields = allow_unknown_fields
+    
+    def _commit(self):
+        """Commit the write session and send later reads to it"""
+        self.session.commit()
+        self.read_session = self.session
+    
+    def _eager_persona_query(self, session=None, selection=None):
+        """
+        Query personas with demographics and attributes batch-loaded (from the read session by default)
+        
+        With a FieldSelection, only the columns, relationships and attribute
+        categories it needs are loaded.
+        """
+        options = selection.load_options() if selection is not None else PERSONA_EAGER_OPTIONS
+        return (session or self.read_session).query(Persona).options(*options)
+    
+    def _filter_by_attribute_values(self, query, filters, match='all'):
+        """
+        Restrict a persona query to personas holding the given list-field values
+        
+        Each filter is a (category, field, value) triple answered from the
+        attribute value index. With match='all' a persona must hold every
+        value; with match='any' one of them is enough.
+        """
+        indexed_fields = get_compiled_config().indexed_fields
+        conditions = []
+        for category, field, value in filters:
+            if field not in indexed_fields.get(category, ()):
+                raise ValueError(f"Field '{category}.{field}' cannot be filtered on")
+            conditions.append(and_(
+                PersonaAttributeValue.category == AttributeCategory(category),
+                PersonaAttributeValue.field == field,
+                PersonaAttributeValue.value == str(value)
+            ))
+        
+        if match == 'any':
+            return query.filter(Persona.id.in_(
+                select(PersonaAttributeValue.persona_id).where(or_(*conditions))
+            ))
+        if match != 'all':
+            raise ValueError(f"Invalid match mode: {match}")
+        for condition in conditions:
+            query = query.filter(Persona.id.in_(
+                select(PersonaAttributeValue.persona_id).where(condition)
+            ))
+        return query
+    
+    def _filter_by_demographics(self, query, demographic_filters):
+        """
+        Restrict a persona query by demographic columns with a single join
+        
+        demographic_filters maps DEMOGRAPHIC_FILTER_FIELDS to a list of accepted
+        values, plus optional 'age_min' and 'age_max' bounds (inclusive).
+        """
+        conditions = []
+        for field, values in demographic_filters.items():
+            if field == 'age_min':
+                conditions.append(DemographicData.age >= values)
+            elif field == 'age_max':
+                conditions.append(DemographicData.age <= values)
+            elif field in DEMOGRAPHIC_FILTER_FIELDS:
+                column = getattr(DemographicData, field)
+                conditions.append(column == values[0] if len(values) == 1 else column.in_(values))
+            else:
+                raise ValueError(f"Field 'demographic.{field}' cannot be filtered on")
+        
+        if not conditions:
+            return query
+        return query.join(Persona.demographic).filter(*conditions)
+    
+    def _filtered_persona_query(self, query, filters=None, match='all', demographic_filters=None):
+        """Apply attribute value and demographic filters to a persona query"""
+        if filters:
+            query = self._filter_by_attribute_values(query, filters, match)
+        if demographic_filters:
+            query = self._filter_by_demographics(query, demographic_filters)
+        return query
+    
+    def count_personas(self, filters=None, match='all', demographic_filters=None):
+        """Count personas, reusing a recent count of the whole table when available"""
+        if filters or demographic_filters:
+            query = self._filtered_persona_query(self.read_session.query(Persona), filters, match,
+                                                 demographic_filters)
+            return query.count()
+        
+        total = total_count_cache.get()
+        if total is None:
+            total = self.read_session.query(Persona).count()
+            total_count_cache.set(total)
+        return total
     
-    def get_all_personas(self, page=1, per_page=20):
-        """Get all personas with pagination"""
-        personas = self.session.query(Persona).order_by(
-            Persona.updated_at.desc()
-        ).offset((page - 1) * per_page).limit(per_page).all()
+    def get_all_personas(self, page=1, per_page=20, cursor=None, include_total=True,
+                         filters=None, match='all', demographic_filters=None, sort=None,
+                         selection=None):
+        """
+        Get all personas, newest first, with offset or keyset pagination
+        
+        When a cursor (from a previous result's next_cursor) is given, the page
+        starts right after that position and page is ignored; the cost of a
+        page is then independent of how deep into the list it is. An empty
+        cursor starts keyset pagination at the first page. Cursors are only
+        available with the default sort.
+        
+        filters is a list of (category, field, value) triples on list-valued
+        attribute fields, combined according to match ('all' or 'any').
+        demographic_filters is described in _filter_by_demographics. sort is
+        a SORT_COLUMNS key, prefixed with '-' for descending order.
+        selection is an optional FieldSelection limiting what is loaded.
         
-        total = self.session.query(Persona).count()
+        Query budget: 4 statements per call (page, count, demographics,
+        attributes) independent of per_page; 3 when include_total is False or
+        the total is served from the count cache. A selection without the
+        demographic or any attribute category saves that statement.
+        """
+        sort = sort or DEFAULT_SORT
+        descending = sort.startswith('-')
+        sort_column = SORT_COLUMNS.get(sort.lstrip('-'))
+        if sort_column is None:
+            raise ValueError(f"Invalid sort: {sort}")
+        if cursor is not None and sort != DEFAULT_SORT:
+            raise ValueError("Cursor pagination is only available with the default sort")
+        
+        query = self._filtered_persona_query(self._eager_persona_query(selection=selection), filters, match,
+                                             demographic_filters)
+        if sort_column.class_ is DemographicData and not demographic_filters:
+            # Keep personas without demographic data when only sorting
+            query = query.outerjoin(Persona.demographic)
+        if descending:
+            query = query.order_by(sort_column.desc(), Persona.id.desc())
+        else:
+            query = query.order_by(sort_column.asc(), Persona.id.asc())
+        
+        if cursor:
+            updated_at, persona_id = decode_cursor(cursor)
+            query = query.filter(or_(
+                Persona.updated_at < updated_at,
+                and_(Persona.updated_at == updated_at, Persona.id < persona_id)
+            ))
+        elif cursor is None:
+            query = query.offset((page - 1) * per_page)
+        
+        # Fetch one extra row to find out whether another page follows
+        personas = query.limit(per_page + 1).all()
+        next_cursor = None
+        if len(personas) > per_page:
+            personas = personas[:per_page]
+            if sort == DEFAULT_SORT:
+                next_cursor = encode_cursor(personas[-1])
         
         return {
             'personas': personas,
-            'total': total,
-            'page': page,
-            'per_page': per_page
+            'total': self.count_personas(filters, match, demographic_filters) if include_total else None,
+            'page': None if cursor is not None else page,
+            'per_page': per_page,
+            'next_cursor': next_cursor
+        }
+    
+    def _locations_within(self, lat, lng, radius_km, limit):
+        """
+        Return up to limit (distance_km, persona_id) pairs within radius_km, nearest first
+        
+        The bounding box is a range scan on the (latitude, longitude) index;
+        the database computes the haversine term of each candidate, filters
+        on it and keeps the nearest limit rows, so only those reach Python.
+        """
+        min_lat, max_lat, lng_ranges = bounding_box(lat, lng, radius_km)
+        term = haversine_term(lat, lng, DemographicData.latitude, DemographicData.longitude)
+        max_term = math.sin(min(radius_km, MAX_DISTANCE_KM) / EARTH_RADIUS_KM / 2) ** 2
+        rows = self.read_session.execute(
+            select(DemographicData.persona_id, term)
+            .where(DemographicData.latitude.between(min_lat, max_lat))
+            .where(or_(*[DemographicData.longitude.between(low, high) for low, high in lng_ranges]))
+            .where(term <= max_term)
+            .order_by(term, DemographicData.persona_id)
+            .limit(limit)
+        ).all()
+        return [
+            (2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(max(0.0, value)))), persona_id)
+            for persona_id, value in rows
+        ]
+    
+    def find_personas_near(self, lat, lng, radius_km=None, k=10):
+        """
+        Find the k personas nearest to a point, optionally within a radius
+        
+        Candidates come from a bounding-box range scan on the (latitude,
+        longitude) index, ranked by distance in the database. The search
+        box starts small and grows until it holds k personas or reaches the
+        radius (the whole globe without one), so the rows scanned depend on
+        how dense the area is rather than on radius_km.
+        
+        Returns:
+            list: (persona, distance_km) pairs, nearest first
+        """
+        limit_km = MAX_DISTANCE_KM if radius_km is None else min(radius_km, MAX_DISTANCE_KM)
+        search_km = min(50.0, limit_km)
+        while True:
+            # k hits within search_km are the k nearest: everything outside is farther
+            matches = self._locations_within(lat, lng, search_km, k)
+            if len(matches) >= k or search_km >= limit_km:
+                break
+            search_km = min(search_km * 4, limit_km)
+        
+        if not matches:
+            return []
+        
+        personas = {
+            persona.id: persona
+            for persona in self._eager_persona_query().filter(
+                Persona.id.in_([persona_id for _, persona_id in matches])
+            )
         }
+        return [
+            (personas[persona_id], distance)
+            for distance, persona_id in matches
+            if persona_id in personas
+        ]
+    
+    def iter_personas(self, updated_since=None, chunk_size=1000):
+        """
+        Iterate over every persona in ID order without loading them all at once
+        
+        Rows are streamed from a server-side cursor chunk_size at a time, and
+        each chunk's demographics and attributes are batch-loaded, so memory
+        use is bounded by the chunk size rather than the table size.
+        
+        Args:
+            updated_since (datetime, optional): Only personas updated at or after this time
+            chunk_size (int): Number of personas fetched per round trip
+        """
+        query = self._eager_persona_query().order_by(Persona.id)
+        if updated_since is not None:
+            query = query.filter(Persona.updated_at >= updated_since)
+        
+        for persona in query.yield_per(chunk_size):
+            yield persona
     
     def get_persona_by_id(self, persona_id):
         """Get a specific persona by ID"""
+        return self.read_session.query(Persona).filter(Persona.id == persona_id).first()
+    
+    def _get_persona_for_update(self, persona_id):
+        """Get a persona by ID from the write session"""
         return self.session.query(Persona).filter(Persona.id == persona_id).first()
     
+    def get_persona_updated_at(self, persona_id):
+        """
+        Get when a persona last changed without loading it
+        
+        Served from the persona cache when possible, otherwise a single-column
+        primary key lookup. Returns None if the persona does not exist.
+        """
+        cached = persona_cache.get(persona_id)
+        if cached is not None:
+            return cached.updated_at
+        return self.read_session.query(Persona.updated_at).filter(Persona.id == persona_id).scalar()
+    
+    def get_serialized_persona(self, persona_id, dumps, selection=None):
+        """
+        Get a persona's JSON representation, from the persona cache when possible
+        
+        The cache holds full representations only, so a read with a selection
+        bypasses it and loads just what the selection needs.
+        
+        Args:
+            persona_id (int): Persona to fetch
+            dumps (callable): Serializer applied to Persona.to_dict() on a cache miss
+            selection (FieldSelection, optional): Parts of the persona to return
+            
+        Returns:
+            CachedPersona: updated_at and payload, or None if the persona does not exist
+        """
+        if selection is not None:
+            persona = self._eager_persona_query(selection=selection).filter(Persona.id == persona_id).first()
+            if not persona:
+                return None
+            return CachedPersona(persona.updated_at, dumps(persona.to_dict(selection)), None)
+        
+        cached = persona_cache.get(persona_id)
+        if cached is not None:
+            return cached
+        
+        generation = persona_cache.generation()
+        persona = self.get_persona_by_id(persona_id)
+        if not persona:
+            return None
+        
+        payload = dumps(persona.to_dict())
+        if self.read_session is self.session:
+            # A lagging replica could put back a version a write just invalidated
+            persona_cache.set(persona.id, persona.updated_at, payload, generation=generation)
+        return CachedPersona(persona.updated_at, payload, None)
+    
+    def get_serialized_personas(self, persona_ids, dumps, selection=None):
+        """
+        Get the JSON representations of several personas, in the order asked for
+        
+        Personas in the persona cache are served from it; the rest are loaded
+        together with one IN query, their demographics and attributes batch-
+        loaded, and added to the cache. With a selection, the cache is
+        bypassed and only what the selection needs is loaded.
+        
+        Query budget: 3 statements (personas, demographics, attributes) however
+        many ids are asked for; none when all of them are cached.
+        
+        Args:
+            persona_ids (list): Persona IDs; repeated IDs are returned once
+            dumps (callable): Serializer applied to Persona.to_dict() on a cache miss
+            selection (FieldSelection, optional): Parts of the personas to return
+        
+        Returns:
+            tuple: ([(persona_id, CachedPersona)] in request order, [missing persona_id])
+        """
+        persona_ids = list(dict.fromkeys(persona_ids))
+        found = {}
+        if selection is None:
+            for persona_id in persona_ids:
+                cached = persona_cache.get(persona_id)
+                if cached is not None:
+                    found[persona_id] = cached
+        
+        uncached = [persona_id for persona_id in persona_ids if persona_id not in found]
+        if uncached:
+            generation = persona_cache.generation()
+            query = self._eager_persona_query(selection=selection).filter(Persona.id.in_(uncached))
+            for persona in query:
+                payload = dumps(persona.to_dict(selection))
+                if selection is None and self.read_session is self.session:
+                    persona_cache.set(persona.id, persona.updated_at, payload, generation=generation)
+                found[persona.id] = CachedPersona(persona.updated_at, payload, None)
+        
+        return (
+            [(persona_id, found[persona_id]) for persona_id in persona_ids if persona_id in found],
+            [persona_id for persona_id in persona_ids if persona_id not in found]
+        )
+    
     def _create_attribute(self, persona_id, category, data):
         """Create a new attribute record for a persona"""
         attr = PersonaAttributes(
@@ -51,6 +570,78 @@ class PersonaService:
         self.session.add(attr)
         return attr
     
+    def _attribute_value_rows(self, persona_id, category, data, fields=None):
+        """Build attribute value index rows for the list-valued fields in data"""
+        category = AttributeCategory(category)
+        rows = []
+        for field in get_compiled_config().indexed_fields.get(category.value, ()):
+            if fields is not None and field not in fields:
+                continue
+            values = data.get(field) if isinstance(data, dict) else None
+            if not isinstance(values, list):
+                continue
+            # dict.fromkeys drops duplicates while keeping the values' order
+            for value in dict.fromkeys(str(v) for v in values if isinstance(v, (str, int, float))):
+                rows.append({'persona_id': persona_id, 'category': category, 'field': field, 'value': value})
+        return rows
+    
+    def _reindex_attribute_values(self, persona_id, category, data, fields):
+        """Replace the attribute value index entries of the given fields"""
+        category = AttributeCategory(category)
+        fields = [
+            field for field in fields
+            if field in get_compiled_config().indexed_fields.get(category.value, ())
+        ]
+        if not fields:
+            return
+        
+        self.session.execute(delete(PersonaAttributeValue).where(
+            PersonaAttributeValue.persona_id == persona_id,
+            PersonaAttributeValue.category == category,
+            PersonaAttributeValue.field.in_(fields)
+        ))
+        rows = self._attribute_value_rows(persona_id, category, data, fields)
+        if rows:
+            self.session.execute(insert(PersonaAttributeValue), rows)
+    
+    def rebuild_attribute_index(self, chunk_size=1000):
+        """
+        Rebuild the attribute value index from the stored attribute data
+        
+        Attribute rows are read chunk_size at a time; the whole rebuild is
+        committed as one transaction. Returns the number of index entries.
+        """
+        self.session.execute(delete(PersonaAttributeValue))
+        
+        entries = 0
+        last_id = 0
+        while True:
+            chunk = self.session.execute(
+                select(PersonaAttributes.id, PersonaAttributes.persona_id,
+                       PersonaAttributes.category, PersonaAttributes.encoding,
+                       PersonaAttributes.data, PersonaAttributes.packed)
+                .where(PersonaAttributes.id > last_id)
+                .order_by(PersonaAttributes.id)
+                .limit(chunk_size)
+            ).all()
+            if not chunk:
+                break
+            
+            rows = []
+            for _, persona_id, category, encoding, data, packed in chunk:
+                try:
+                    decoded = storage.decode(encoding, data, packed)
+                except (TypeError, ValueError, zlib.error):
+                    continue
+                rows.extend(self._attribute_value_rows(persona_id, category, decoded))
+            if rows:
+                self.session.execute(insert(PersonaAttributeValue), rows)
+            entries += len(rows)
+            last_id = chunk[-1][0]
+        
+        self._commit()
+        return entries
+    
     def create_persona(self, persona_data):
         """Create a new persona with related data"""
         # Create main persona
@@ -106,12 +697,149 @@ class PersonaService:
                 data=persona_data['contextual']
             )
         
-        self.session.commit()
+        # Index list-valued attribute fields
+        value_rows = []
+        for category in CATEGORIES:
+            if category in persona_data:
+                value_rows.extend(self._attribute_value_rows(persona.id, category, persona_data[category]))
+        if value_rows:
+            self.session.execute(insert(PersonaAttributeValue), value_rows)
+        
+        self._commit()
+        total_count_cache.invalidate()
         return persona
     
+    def bulk_create_personas(self, items):
+        """
+        Create many personas in a single transaction
+        
+        Every item is validated first (name, demographic data and attribute
+        categories); invalid items are reported and skipped, so one bad item
+        never fails the batch. Valid items are written with one multi-row
+        INSERT per table, so the statement count does not grow with the
+        number of personas.
+        
+        Returns:
+            dict: 'created' maps each accepted item index to its new persona ID,
+            'errors' lists {'index', 'error', 'details'} for rejected items
+        """
+        item_errors = {}
+        payloads = []
+        payload_owners = []
+        for index, persona_data in enumerate(items):
+            is_valid, error = validate_persona_shape(persona_data)
+            if not is_valid:
+                item_errors[index] = (
+                    {'error': error} if isinstance(error, str)
+                    else {'error': 'Invalid demographic data', 'details': error}
+                )
+            else:
+                for category in CATEGORIES:
+                    if category in persona_data:
+                        payloads.append((category, persona_data[category]))
+                        payload_owners.append(index)
+        
+        # Validate every category payload of every item in one pass
+        for index, (category, _), (is_valid, error) in zip(
+                payload_owners, payloads, self.validate_category_batch(payloads)):
+            if not is_valid and index not in item_errors:
+                item_errors[index] = {'error': f'Invalid {category} data', 'details': error}
+        
+        errors = [{'index': index, **item_errors[index]} for index in sorted(item_errors)]
+        valid = [
+            (index, persona_data) for index, persona_data in enumerate(items)
+            if index not in item_errors
+        ]
+        
+        if not valid:
+            return {'created': [], 'errors': errors}
+        
+        now = datetime.utcnow()
+        persona_rows = [
+            {'name': persona_data['name'], 'created_at': now, 'updated_at': now}
+            for _, persona_data in valid
+        ]
+        # Integer keys are assigned in row order within a multi-row INSERT, so
+        # the ascending ids line up with persona_rows. Asking SQLAlchemy to
+        # sort by parameter order instead would fall back to one INSERT per
+        # row on SQLite.
+        persona_ids = sorted(self.session.scalars(
+            insert(Persona).returning(Persona.id), persona_rows
+        ).all())
+        
+        demographic_rows = []
+        attribute_rows = []
+        value_rows = []
+        for persona_id, (_, persona_data) in zip(persona_ids, valid):
+            demo_data = persona_data.get('demographic')
+            if demo_data is not None:
+                row = {field: demo_data.get(field) for field in DEMOGRAPHIC_FIELDS}
+                row['persona_id'] = persona_id
+                demographic_rows.append(row)
+            for category in CATEGORIES:
+                if category in persona_data:
+                    encoding, stored, packed = storage.encode(persona_data[category] or {})
+                    attribute_rows.append({
+                        'persona_id': persona_id,
+                        'category': AttributeCategory(category),
+                        'encoding': encoding,
+                        'data': stored,
+                        'packed': packed
+                    })
+                    value_rows.extend(self._attribute_value_rows(persona_id, category, persona_data[category]))
+        
+        if demographic_rows:
+            self.session.execute(insert(DemographicData), demographic_rows)
+        if attribute_rows:
+            self.session.execute(insert(PersonaAttributes), attribute_rows)
+        if value_rows:
+            self.session.execute(insert(PersonaAttributeValue), value_rows)
+        
+        self._commit()
+        total_count_cache.invalidate()
+        
+        created = [
+            {'index': index, 'id': persona_id}
+            for persona_id, (index, _) in zip(persona_ids, valid)
+        ]
+        return {'created': created, 'errors': errors}
+    
+    def _apply_demographic_data(self, persona, demographic_data):
+        """Apply demographic fields to a loaded persona, creating the record if needed"""
+        if not persona.demographic:
+            persona.demographic = DemographicData(persona_id=persona.id)
+            self.session.add(persona.demographic)
+        
+        for field in DEMOGRAPHIC_FIELDS:
+            if field in demographic_data:
+                setattr(persona.demographic, field, demographic_data[field])
+    
+    def _apply_attribute_data(self, persona, category, data):
+        """Merge data into a loaded persona's attribute record, creating it if needed"""
+        attr = persona.get_attribute_by_category(category)
+        if not attr:
+            attr = self._create_attribute(persona.id, category, {})
+            persona.attributes.append(attr)
+        
+        if data:
+            current_data = attr.get_data()
+            # Merge with existing data
+            for key, value in data.items():
+                current_data[key] = value
+            
+            attr.set_data(current_data)
+            self._reindex_attribute_values(persona.id, attr.category, current_data, data.keys())
+        return attr
+    
     def update_persona(self, persona_id, persona_data):
-        """Update an existing persona"""
-        persona = self.get_persona_by_id(persona_id)
+        """
+        Update an existing persona
+        
+        The persona, its demographic record and its attributes are loaded
+        once, every change is applied in memory, and the update is committed
+        in a single transaction.
+        """
+        persona = self._eager_persona_query(self.session).filter(Persona.id == persona_id).first()
         if not persona:
             return None
         
@@ -123,158 +851,167 @@ class PersonaService:
         
         # Update demographic data if provided
         if 'demographic' in persona_data:
-            demo_data = persona_data['demographic']
-            
-            # Create if it doesn't exist
-            if not persona.demographic:
-                persona.demographic = DemographicData(persona_id=persona.id)
-                self.session.add(persona.demographic)
-            
-            # Update fields
-            for field in ['latitude', 'longitude', 'language', 'country', 'city', 
-                         'region', 'age', 'gender', 'education', 'income', 'occupation']:
-                if field in demo_data:
-                    setattr(persona.demographic, field, demo_data[field])
-        
-        # Update psychographic data if provided
-        if 'psychographic' in persona_data:
-            self.update_attribute_data(
-                persona_id=persona.id,
-                category=AttributeCategory.PSYCHOGRAPHIC,
-                data=persona_data['psychographic']
-            )
-        
-        # Update behavioral data if provided
-        if 'behavioral' in persona_data:
-            self.update_attribute_data(
-                persona_id=persona.id,
-                category=AttributeCategory.BEHAVIORAL,
-                data=persona_data['behavioral']
-            )
+            self._apply_demographic_data(persona, persona_data['demographic'])
         
-        # Update contextual data if provided
-        if 'contextual' in persona_data:
-            self.update_attribute_data(
-                persona_id=persona.id,
-                category=AttributeCategory.CONTEXTUAL,
-                data=persona_data['contextual']
-            )
+        # Update attribute categories if provided
+        for category in CATEGORIES:
+            if category in persona_data:
+                self._apply_attribute_data(persona, AttributeCategory(category), persona_data[category])
         
-        self.session.commit()
+        self._commit()
+        persona_cache.invalidate(persona.id)
         return persona
     
     def delete_persona(self, persona_id):
         """Delete a persona and all its associated data"""
-        persona = self.get_persona_by_id(persona_id)
+        persona = self._get_persona_for_update(persona_id)
         if not persona:
             return False
         
         self.session.delete(persona)
-        self.session.commit()
+        self._commit()
+        persona_cache.invalidate(persona_id)
+        total_count_cache.invalidate()
         return True
     
     def update_demographic_data(self, persona_id, demographic_data):
         """Update demographic data for a persona"""
-        persona = self.get_persona_by_id(persona_id)
+        persona = self._get_persona_for_update(persona_id)
         if not persona:
             return None
         
-        if not persona.demographic:
-            persona.demographic = DemographicData(persona_id=persona.id)
-            self.session.add(persona.demographic)
-        
-        # Update fields
-        for field in ['latitude', 'longitude', 'language', 'country', 'city', 
-                     'region', 'age', 'gender', 'education', 'income', 'occupation']:
-            if field in demographic_data:
-                setattr(persona.demographic, field, demographic_data[field])
+        self._apply_demographic_data(persona, demographic_data)
         
         persona.updated_at = datetime.utcnow()
-        self.session.commit()
+        self._commit()
+        persona_cache.invalidate(persona.id)
         return persona.demographic
     
     def get_attribute_data(self, persona_id, category):
         """Get attribute data for a specific category"""
+        data, _ = self.get_versioned_attribute_data(persona_id, category)
+        return data
+    
+    def get_versioned_attribute_data(self, persona_id, category):
+        """
+        Get attribute data for a category along with the persona's updated_at
+        
+        Returns:
+            tuple: (data, updated_at), or (None, None) if the persona does not exist
+        """
         persona = self.get_persona_by_id(persona_id)
         if not persona:
-            return None
+            return None, None
         
         # Find attribute for category
         attr = persona.get_attribute_by_category(category)
         if not attr:
-            return {}
+            return {}, persona.updated_at
         
-        return attr.get_data()
+        return attr.get_data(), persona.updated_at
     
     def update_attribute_data(self, persona_id, category, data):
         """Update attribute data for a specific category"""
-        persona = self.get_persona_by_id(persona_id)
+        persona = self._get_persona_for_update(persona_id)
         if not persona:
             return None
         
-        # Find or create attribute for category
-        attr = persona.get_attribute_by_category(category)
-        if not attr:
-            attr = self._create_attribute(persona_id, category, {})
-            
-        # Update data
-        if data:
-            current_data = attr.get_data()
-            # Merge with existing data
-            for key, value in data.items():
-                current_data[key] = value
-                
-            attr.set_data(current_data)
+        attr = self._apply_attribute_data(persona, category, data)
         
         persona.updated_at = datetime.utcnow()
-        self.session.commit()
+        self._commit()
+        persona_cache.invalidate(persona.id)
         return attr
     
+    def _supports_json_set(self):
+        """Whether the database can update JSON text in place with json_set ... RETURNING"""
+        dialect = self.session.get_bind().dialect
+        return dialect.name == 'sqlite' and dialect.update_returning
+    
+    def patch_attribute_data(self, persona_id, category, data):
+        """
+        Set top-level keys of a persona's attribute data inside the database
+        
+        On SQLite the changed keys are written with a single json_set UPDATE,
+        so the stored blob is never read into Python and re-encoded. Other
+        databases, compressed storage formats, and keys that cannot be written
+        as a JSON path go through update_attribute_data. The resulting merge
+        is the same either way.
+        
+        Returns:
+            dict: The full attribute data after the update, or None if the persona does not exist
+        """
+        if (not data or not self._supports_json_set() or storage.write_format() != storage.JSON
+                or any('"' in key for key in data)):
+            attr = self.update_attribute_data(persona_id, category, data)
+            return attr.get_data() if attr is not None else None
+        
+        category = AttributeCategory(category)
+        touched = self.session.execute(
+            update(Persona)
+            .where(Persona.id == persona_id)
+            .values(updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if touched.rowcount == 0:
+            self.session.rollback()
+            return None
+        
+        json_set_args = []
+        for key, value in data.items():
+            json_set_args.extend([f'$."{key}"', func.json(codec.dumps(value))])
+        
+        stored = self.session.execute(
+            update(PersonaAttributes)
+            .where(PersonaAttributes.persona_id == persona_id,
+                   PersonaAttributes.category == category,
+                   PersonaAttributes.encoding == storage.JSON)
+            .values(data=func.json_set(PersonaAttributes.data, *json_set_args))
+            .returning(PersonaAttributes.data)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        
+        if stored is None:
+            existing = self.session.execute(
+                select(PersonaAttributes.id)
+                .where(PersonaAttributes.persona_id == persona_id,
+                       PersonaAttributes.category == category)
+            ).first()
+            if existing is not None:
+                # The record is stored compressed; merge it in Python, which rewrites it as JSON
+                self.session.rollback()
+                attr = self.update_attribute_data(persona_id, category.value, data)
+                return attr.get_data() if attr is not None else None
+            
+            # No record for this category yet
+            stored = codec.dumps(data)
+            self.session.execute(insert(PersonaAttributes).values(
+                persona_id=persona_id, category=category, encoding=storage.JSON, data=stored
+            ))
+        
+        # Whole top-level values are replaced, so the patch itself holds the new index values
+        self._reindex_attribute_values(persona_id, category, data, data.keys())
+        
+        self._commit()
+        persona_cache.invalidate(persona_id)
+        return codec.loads(stored)
+    
     def get_field_config(self, category=None, field_name=None):
         """Get field configuration"""
         return persona_field_config.get_field_config(category, field_name)
     
     def validate_category_data(self, category, data):
         """Validate data against field configuration"""
-        if category not in ['psychographic', 'behavioral', 'contextual']:
-            return False, f"Invalid category: {category}"
-        
-        if not isinstance(data, dict):
-            return False, "Data must be a dictionary"
-        
-        # Get configuration for this category
-        config = self.get_field_config(category)
-        if not config:
-            return False, f"No configuration found for category: {category}"
-        
-        # Validate each field
-        errors = []
-        for field_def in config.get('fields', []):
-            field_name = field_def.get('name')
-            field_type = field_def.get('type')
-            
-            # Skip validation if field is not in data
-            if field_name not in data:
-                continue
-                
-            value = data[field_name]
-            
-            # Validate field based on type
-            if field_type == 'list' and not isinstance(value, list):
-                errors.append(f"Field '{field_name}' must be a list")
-            elif field_type == 'dict' and not isinstance(value, dict):
-                errors.append(f"Field '{field_name}' must be a dictionary")
-            elif field_type == 'string' and value is not None and not isinstance(value, str):
-                errors.append(f"Field '{field_name}' must be a string")
-                
-            # Validate options if defined
-            if 'options' in field_def and value is not None and value not in field_def['options']:
-                errors.append(f"Field '{field_name}' must be one of: {', '.join(field_def['options'])}")
-        
-        if errors:
-            return False, errors
+        return get_compiled_config().validate(category, data, self.allow_unknown_fields)
+    
+    def validate_category_batch(self, payloads):
+        """
+        Validate many (category, data) payloads against field configuration in one pass
         
-        return True, None
+        Returns:
+            list: One (is_valid, error) tuple per payload, in order
+        """
+        return get_compiled_config().validate_many(payloads, self.allow_unknown_fields)
     
     # Legacy methods for backward compatibility
     def update_psychographic_data(self, persona_id, psychographic_data):
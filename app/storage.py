@@ -0,0 +1,75 @@
+"""
+Storage encodings for persona attribute data
+
+Each persona_attributes row records the encoding of its data in the
+'encoding' column:
+
+- json: JSON text in the 'data' column (the original format)
+- zlib-v1: compact JSON compressed with zlib using a preset dictionary of the
+  field names and option values from the default field configuration, stored
+  in the 'packed' column
+
+A preset dictionary is needed to decode a row, so it must never change. A
+different dictionary goes under a new encoding tag, and the old one stays
+here to read existing rows.
+"""
+import zlib
+from app import codec
+from app.config import ATTRIBUTE_STORAGE_FORMAT
+
+JSON = 'json'
+ZLIB_V1 = 'zlib-v1'
+
+# zlib weights the end of the dictionary most, so the most common fragments come last
+_ZLIB_V1_DICTIONARY = (
+    b'"monthly""weekly""hourly""multiple times/day""hours/day"'
+    b'"morning""afternoon""evening""night""all day""weekday""weekend""all week"'
+    b'"spring""summer""fall""winter""sunny""rainy""cloudy"'
+    b'"desktop""laptop""tablet""mobile""chrome""firefox""safari""edge"'
+    b'"wifi""ethernet""4g""5g""3g""1920x1080""412x915"'
+    b'{"time_of_day":"day_of_week":"season":"weather":"device_type":"browser_type":'
+    b'"screen_size":"connection_type":"'
+    b'{"browsing_habits":["purchase_history":["brand_interactions":["device_usage":{'
+    b'"social_media_activity":{"content_consumption":{"daily"'
+    b'{"interests":["personal_values":["attitudes":["lifestyle":"personality":"opinions":["'
+)
+
+FORMATS = (JSON, ZLIB_V1)
+
+_write_format = ATTRIBUTE_STORAGE_FORMAT
+
+def use_format(name):
+    """Select the encoding used for newly written attribute data"""
+    global _write_format
+    if name not in FORMATS:
+        raise ValueError(f"Invalid attribute storage format: {name}")
+    _write_format = name
+
+def write_format():
+    """Encoding used for newly written attribute data"""
+    return _write_format
+
+def encode(data, encoding=None):
+    """
+    Encode an attribute data dictionary for storage
+
+    Returns:
+        tuple: (encoding, data_text, packed_bytes) column values
+    """
+    encoding = encoding or _write_format
+    text = codec.dumps(data)
+    if encoding == JSON:
+        return JSON, text, None
+    if encoding == ZLIB_V1:
+        compressor = zlib.compressobj(9, zdict=_ZLIB_V1_DICTIONARY)
+        return ZLIB_V1, '', compressor.compress(text.encode()) + compressor.flush()
+    raise ValueError(f"Invalid attribute storage format: {encoding}")
+
+def decode(encoding, data, packed):
+    """Decode stored column values back into the attribute data dictionary"""
+    if encoding in (None, JSON):
+        return codec.loads(data)
+    if encoding == ZLIB_V1:
+        decompressor = zlib.decompressobj(zdict=_ZLIB_V1_DICTIONARY)
+        return codec.loads(decompressor.decompress(packed) + decompressor.flush())
+    raise ValueError(f"Unknown attribute storage encoding: {encoding}")
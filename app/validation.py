@@ -0,0 +1,144 @@
+"""
+Compiled validation of persona attribute data against the field configuration
+"""
+import persona_field_config
+
+CATEGORIES = ('psychographic', 'behavioral', 'contextual')
+
+TYPE_CHECKS = {
+    'list': (list, 'a list', False),
+    'dict': (dict, 'a dictionary', False),
+    'string': (str, 'a string', True),
+}
+
+class FieldValidator:
+    """Checks for a single configured field, prepared once from its definition"""
+
+    __slots__ = ('name', 'type_check', 'options', 'option_set', 'options_message')
+
+    def __init__(self, field_def):
+        """Initialize from a field definition in the field configuration"""
+        self.name = field_def.get('name')
+        self.type_check = TYPE_CHECKS.get(field_def.get('type'))
+        self.options = field_def.get('options')
+        self.option_set = frozenset(self.options) if self.options is not None else None
+        self.options_message = (
+            f"Field '{self.name}' must be one of: {', '.join(self.options)}"
+            if self.options is not None else None
+        )
+
+    def check(self, value, errors):
+        """Append any errors for value to errors"""
+        if self.type_check is not None:
+            expected_type, description, allows_none = self.type_check
+            if not isinstance(value, expected_type) and not (allows_none and value is None):
+                errors.append(f"Field '{self.name}' must be {description}")
+
+        if self.option_set is not None and value is not None:
+            try:
+                allowed = value in self.option_set
+            except TypeError:
+                # Unhashable values such as lists can never match an option
+                allowed = False
+            if not allowed:
+                errors.append(self.options_message)
+
+class CompiledFieldConfig:
+    """Per-category tables of field validators built from a field configuration"""
+
+    def __init__(self, config):
+        """Compile the given field configuration"""
+        self.source = config
+        self.categories = {
+            category: {
+                field_def.get('name'): FieldValidator(field_def)
+                for field_def in category_config.get('fields', [])
+            }
+            for category, category_config in config.items()
+            if category_config
+        }
+        # List-valued fields, whose values are kept in the attribute value index
+        self.indexed_fields = {
+            category: frozenset(name for name, validator in validators.items()
+                                if validator.type_check is TYPE_CHECKS['list'])
+            for category, validators in self.categories.items()
+        }
+
+    def validate(self, category, data, allow_unknown=True):
+        """
+        Validate one category payload
+
+        Returns:
+            tuple: (is_valid, error) where error is None, a message, or a list of messages
+        """
+        validators, error = self._resolve(category)
+        if error is not None:
+            return False, error
+        return self._check(category, validators, tuple(validators.items()), data, allow_unknown)
+
+    def validate_many(self, payloads, allow_unknown=True):
+        """
+        Validate many (category, data) payloads in one pass
+
+        Each category's validators are resolved once for the whole batch
+        rather than once per payload.
+
+        Returns:
+            list: One (is_valid, error) tuple per payload, in order
+        """
+        resolved = {}
+        results = []
+        check = self._check
+        for category, data in payloads:
+            entry = resolved.get(category)
+            if entry is None:
+                validators, error = self._resolve(category)
+                entry = resolved[category] = (
+                    validators, tuple(validators.items()) if validators is not None else None, error)
+            validators, checks, error = entry
+            if error is not None:
+                results.append((False, error))
+            else:
+                results.append(check(category, validators, checks, data, allow_unknown))
+        return results
+
+    def _resolve(self, category):
+        """Return (validators, error) for a category name"""
+        if category not in CATEGORIES:
+            return None, f"Invalid category: {category}"
+        validators = self.categories.get(category)
+        if validators is None:
+            return None, f"No configuration found for category: {category}"
+        return validators, None
+
+    @staticmethod
+    def _check(category, validators, checks, data, allow_unknown):
+        """Validate one payload against a category's resolved validators"""
+        if not isinstance(data, dict):
+            return False, "Data must be a dictionary"
+
+        errors = []
+        for name, validator in checks:
+            if name in data:
+                validator.check(data[name], errors)
+
+        if not allow_unknown:
+            unknown = [name for name in data if name not in validators]
+            if unknown:
+                errors.append(f"Unknown fields for {category}: {', '.join(unknown)}")
+
+        if errors:
+            return False, errors
+
+        return True, None
+
+_compiled = None
+
+def get_compiled_config():
+    """Return the compiled form of persona_field_config.PERSONA_FIELD_CONFIG"""
+    global _compiled
+    config = persona_field_config.PERSONA_FIELD_CONFIG
+    # Recompile if the configuration object was replaced (e.g. a custom config was loaded)
+    if _compiled is None or _compiled.source is not config:
+        _compiled = CompiledFieldConfig(config)
+    return _compiled
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Compare how many requests one server process keeps in flight, sync vs ASGI.
+
+A database is seeded, then one process is started per mode: a gunicorn
+sync worker (as in docker-compose), a gunicorn worker with threads, and the
+ASGI mode (app/asgi.py) under uvicorn. For each concurrency level, that many
+clients send persona GETs and attribute PATCHes for a fixed time, each on a
+new connection. Reads bypass the persona cache so they query the database.
+
+To reproduce slow SQLite writes, a lock holder in this process keeps the
+database's write lock for --lock-hold-ms out of every --lock-interval-ms. A
+PATCH arriving meanwhile waits on the lock (up to SQLITE_BUSY_TIMEOUT). In
+a sync worker, that wait also stalls every request queued behind it; in the
+ASGI mode the wait happens off the event loop. Needs gunicorn, uvicorn and
+aiosqlite.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import percentile, seed_personas
+from sqlalchemy.orm import sessionmaker
+from app.database import make_engine
+from app.models import Base
+from app.services import PersonaService
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+MODES = {
+    'sync': [sys.executable, '-m', 'gunicorn', '--workers', '1', '--bind', '127.0.0.1:{port}',
+             '--timeout', '120', 'app:create_app()'],
+    'threads': [sys.executable, '-m', 'gunicorn', '--workers', '1', '--threads', '8',
+                '--bind', '127.0.0.1:{port}', '--timeout', '120', 'app:create_app()'],
+    'async': [sys.executable, '-m', 'uvicorn', '--factory', 'app.asgi:create_asgi_app',
+              '--host', '127.0.0.1', '--port', '{port}', '--log-level', 'warning'],
+}
+WEATHER = ('sunny', 'rainy', 'cloudy')
+
+def seed(path, personas):
+    """Create a database at path holding template personas"""
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    seed_personas(PersonaService(session), personas)
+    session.close()
+    engine.dispose()
+
+def start_server(mode, port, db_path):
+    """Start one server process and wait until it answers /health"""
+    env = dict(os.environ, DATABASE_URI=f"sqlite:///{db_path}", PERSONA_CACHE_SIZE='0')
+    command = [part.format(port=port) for part in MODES[mode]]
+    process = subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+            return process
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError(f"{mode} server exited with status {process.returncode}")
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"{mode} server did not start")
+
+def stop_server(process):
+    """Stop a server process"""
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+def hold_write_lock(db_path, hold_seconds, interval_seconds, stop):
+    """Keep the database's write lock for hold_seconds out of every interval_seconds"""
+    connection = sqlite3.connect(db_path, isolation_level=None, timeout=30)
+    try:
+        while not stop.wait(max(0.0, interval_seconds - hold_seconds)):
+            connection.execute('BEGIN IMMEDIATE')
+            time.sleep(hold_seconds)
+            connection.execute('COMMIT')
+    finally:
+        connection.close()
+
+async def http_request(port, method, path, body=None, timeout=60.0):
+    """Send one request on a new connection, returning the status code"""
+    reader, writer = await asyncio.wait_for(asyncio.open_connection('127.0.0.1', port), timeout)
+    try:
+        payload = json.dumps(body).encode() if body is not None else b''
+        head = (f"{method} {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n")
+        writer.write(head.encode() + payload)
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        await asyncio.wait_for(reader.read(), timeout)
+        return int(status_line.split()[1])
+    finally:
+        writer.close()
+
+async def client(port, rng, personas, write_ratio, deadline, latencies, errors):
+    """Send requests back to back until deadline"""
+    while time.perf_counter() < deadline:
+        persona_id = rng.randint(1, personas)
+        write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if write:
+                status = await http_request(port, 'PATCH', f"/api/v1/personas/{persona_id}/attributes/contextual",
+                                            {'weather': rng.choice(WEATHER)})
+            else:
+                status = await http_request(port, 'GET', f"/api/v1/personas/{persona_id}")
+        except (OSError, asyncio.TimeoutError, ValueError, IndexError):
+            status = None
+        if status == 200:
+            latencies['write' if write else 'read'].append(time.perf_counter() - started)
+        else:
+            errors.append(status)
+
+async def run_load(port, concurrency, duration, personas, write_ratio, seed_value):
+    """Run concurrency clients for duration seconds and summarize"""
+    latencies = {'read': [], 'write': []}
+    errors = []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        client(port, random.Random(seed_value + index), personas, write_ratio, deadline, latencies, errors)
+        for index in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    summary = {'concurrency': concurrency, 'errors': len(errors),
+               'requests_per_second': round((len(latencies['read']) + len(latencies['write'])) / elapsed, 1)}
+    for kind, values in latencies.items():
+        values.sort()
+        summary[f'{kind}_p50_ms'] = round(percentile(values, 0.50) * 1000, 1)
+        summary[f'{kind}_p99_ms'] = round(percentile(values, 0.99) * 1000, 1)
+    return summary
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Compare in-flight capacity of the sync and ASGI servers")
+    parser.add_argument("--modes", default=",".join(MODES), help="Comma-separated modes: sync, threads, async")
+    parser.add_argument("--concurrency", default="1,8,32,128", help="Comma-separated client counts")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--personas", type=int, default=10000, help="Personas to seed")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of requests that PATCH")
+    parser.add_argument("--lock-hold-ms", type=float, default=200.0,
+                        help="Milliseconds the write lock is held per interval (0 disables)")
+    parser.add_argument("--lock-interval-ms", type=float, default=1000.0, help="Lock holder period")
+    parser.add_argument("--port", type=int, default=5090, help="Port for the servers")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the clients")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    modes = args.modes.split(",")
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    work_dir = tempfile.mkdtemp(prefix="persona-async-")
+    template = os.path.join(work_dir, "template.db")
+    print(f"Seeding {args.personas} personas", flush=True)
+    seed(template, args.personas)
+
+    results = []
+    try:
+        for mode in modes:
+            # A fresh copy per mode, so earlier PATCHes do not change the next run
+            db_path = os.path.join(work_dir, f"{mode}.db")
+            source, target = sqlite3.connect(template), sqlite3.connect(db_path)
+            source.backup(target)
+            target.close()
+            source.close()
+
+            process = start_server(mode, args.port, db_path)
+            stop = threading.Event()
+            holder = None
+            if args.lock_hold_ms > 0:
+                holder = threading.Thread(target=hold_write_lock, daemon=True,
+                                          args=(db_path, args.lock_hold_ms / 1000, args.lock_interval_ms / 1000, stop))
+                holder.start()
+            try:
+                for concurrency in levels:
+                    summary = asyncio.run(run_load(args.port, concurrency, args.duration, args.personas,
+                                                   args.write_ratio, args.seed))
+                    summary['mode'] = mode
+                    results.append(summary)
+                    print(f"{mode:>7} c={concurrency:<4} {summary['requests_per_second']:8.1f} req/s  "
+                          f"read p50 {summary['read_p50_ms']:7.1f} p99 {summary['read_p99_ms']:7.1f} ms  "
+                          f"write p50 {summary['write_p50_ms']:7.1f} p99 {summary['write_p99_ms']:7.1f} ms  "
+                          f"errors {summary['errors']}", flush=True)
+            finally:
+                stop.set()
+                if holder:
+                    holder.join()
+                stop_server(process)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'settings': vars(args), 'results': results}, file, indent=2)
+        print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
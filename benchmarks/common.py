@@ -0,0 +1,43 @@
+"""
+Helpers shared by the benchmark scripts
+"""
+import copy
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from add_default_personas import DEFAULT_PERSONAS
+
+def persona_from_template(index, rng=None):
+    """
+    Build a persona payload from the default templates
+
+    Templates are used round-robin. The name is made unique, and with an rng
+    the age and location are jittered so demographic indexes see a spread
+    of values.
+    """
+    item = copy.deepcopy(DEFAULT_PERSONAS[index % len(DEFAULT_PERSONAS)])
+    item['name'] = f"{item['name']} {index}"
+    if rng is not None:
+        demographic = item['demographic']
+        demographic['age'] = max(18, min(90, demographic['age'] + rng.randint(-10, 10)))
+        demographic['latitude'] = round(demographic['latitude'] + rng.uniform(-1, 1), 4)
+        demographic['longitude'] = round(demographic['longitude'] + rng.uniform(-1, 1), 4)
+    return item
+
+def seed_personas(service, count, batch_size=5000, seed=0, progress=False):
+    """Insert count template personas through PersonaService.bulk_create_personas"""
+    rng = random.Random(seed)
+    for start in range(0, count, batch_size):
+        items = [persona_from_template(i, rng) for i in range(start, min(start + batch_size, count))]
+        service.bulk_create_personas(items)
+        if progress:
+            print(f"  seeded {min(start + batch_size, count)}/{count}", flush=True)
+
+def percentile(values, fraction):
+    """Value at the given fraction of a sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * fraction))]
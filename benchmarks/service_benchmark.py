@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark the persona hot paths through PersonaService and the HTTP API.
+
+For each database size a SQLite database is seeded from the templates in
+add_default_personas.py (or reused from --data-dir), copied to a scratch
+file, and list, get, create, update and attribute-PATCH are timed through
+PersonaService and through the Flask test client. Throughput and latency
+percentiles are written as JSON for comparison across releases.
+
+Seeding runs at a few thousand personas per second, so the 1M database
+takes several minutes the first time; keep it with --data-dir.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import percentile, persona_from_template, seed_personas
+import sqlalchemy
+from sqlalchemy.orm import sessionmaker
+from app import config, create_app
+from app.database import make_engine
+from app.models import Base, Persona
+from app.services import PersonaService
+
+OPERATIONS = ('list', 'get', 'create', 'update', 'patch')
+LAYERS = ('service', 'api')
+WEATHER = ('sunny', 'rainy', 'cloudy')
+
+def build_database(path, size):
+    """Create a database at path holding size template personas"""
+    engine = make_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    print(f"Seeding {size} personas into {path}", flush=True)
+    seed_personas(PersonaService(session), size, progress=size >= 100000)
+    session.close()
+    engine.dispose()
+
+def prepare_database(size, data_dir, scratch_dir):
+    """Return a scratch copy of the seeded database for size, building it if needed"""
+    template = os.path.join(data_dir, f"personas-{size}.db")
+    if not os.path.exists(template):
+        build_database(template, size)
+    # Benchmarks write, so they run on a copy and the seeded file stays reusable
+    scratch = os.path.join(scratch_dir, f"bench-{size}.db")
+    source = sqlite3.connect(template)
+    target = sqlite3.connect(scratch)
+    source.backup(target)
+    target.close()
+    source.close()
+    return scratch
+
+def service_operations(service, rng, max_id, per_page):
+    """Callables for each operation through PersonaService"""
+    pages = max(1, min(50, max_id // per_page))
+
+    def list_personas():
+        result = service.get_all_personas(page=rng.randint(1, pages), per_page=per_page)
+        return [persona.to_dict() for persona in result['personas']]
+
+    def get_persona():
+        return service.get_persona_by_id(rng.randint(1, max_id)).to_dict()
+
+    def create_persona():
+        return service.create_persona(persona_from_template(rng.randrange(1000), rng)).id
+
+    def update_persona():
+        persona_id = rng.randint(1, max_id)
+        return service.update_persona(persona_id, {'name': f"Updated {persona_id}",
+                                                   'demographic': {'age': rng.randint(18, 90)}})
+
+    def patch_attributes():
+        return service.patch_attribute_data(rng.randint(1, max_id), 'contextual',
+                                            {'weather': rng.choice(WEATHER)})
+
+    return {'list': list_personas, 'get': get_persona, 'create': create_persona,
+            'update': update_persona, 'patch': patch_attributes}
+
+def api_operations(client, rng, max_id, per_page):
+    """Callables for each operation through the Flask test client"""
+    pages = max(1, min(50, max_id // per_page))
+
+    def check(response, expected=200):
+        if response.status_code != expected:
+            raise RuntimeError(f"Unexpected status {response.status_code}: {response.get_data(as_text=True)[:200]}")
+        return response
+
+    return {
+        'list': lambda: check(client.get(f"/api/v1/personas?page={rng.randint(1, pages)}&per_page={per_page}")),
+        'get': lambda: check(client.get(f"/api/v1/personas/{rng.randint(1, max_id)}")),
+        'create': lambda: check(client.post("/api/v1/personas",
+                                            json=persona_from_template(rng.randrange(1000), rng)), 201),
+        'update': lambda: check(client.put(f"/api/v1/personas/{rng.randint(1, max_id)}",
+                                           json={'demographic': {'age': rng.randint(18, 90)}})),
+        'patch': lambda: check(client.patch(f"/api/v1/personas/{rng.randint(1, max_id)}/attributes/contextual",
+                                            json={'weather': rng.choice(WEATHER)})),
+    }
+
+def measure(operation, iterations, warmup, after=None):
+    """Time iterations calls of operation and summarize the latencies"""
+    for _ in range(warmup):
+        operation()
+        if after:
+            after()
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call_started = time.perf_counter()
+        operation()
+        if after:
+            after()
+        latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'iterations': iterations,
+        'ops_per_second': round(iterations / elapsed, 1),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p90_ms': round(percentile(latencies, 0.90) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+    }
+
+def app_config(db_path, cache):
+    """Application config for the API layer, from app.config with benchmark overrides"""
+    settings = {name: getattr(config, name) for name in dir(config) if name.isupper()}
+    settings.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{db_path}", TESTING=True)
+    if cache:
+        # The cache is opt-in; one process sees all of its own invalidations
+        settings['PERSONA_CACHE_SIZE'] = settings['PERSONA_CACHE_SIZE'] or 1024
+        settings['PERSONA_CACHE_TTL'] = max(settings['PERSONA_CACHE_TTL'], 30.0)
+    else:
+        settings['PERSONA_CACHE_SIZE'] = 0
+    return settings
+
+def run_size(size, args, scratch_dir):
+    """Benchmark every selected layer and operation for one database size"""
+    db_path = prepare_database(size, args.data_dir, scratch_dir)
+    results = []
+    for layer in args.layers:
+        rng = random.Random(args.seed)
+        if layer == 'service':
+            engine = make_engine(f"sqlite:///{db_path}")
+            session = sessionmaker(bind=engine)()
+            max_id = session.query(sqlalchemy.func.max(Persona.id)).scalar() or 1
+            service = PersonaService(session)
+            operations = service_operations(service, rng, max_id, args.per_page)
+            # A request ends with the session closed, so identity-map hits do not flatter reads
+            after = session.close
+        else:
+            app = create_app(app_config(db_path, args.cache))
+            client = app.test_client()
+            max_id = size
+            operations = api_operations(client, rng, max_id, args.per_page)
+            after = None
+
+        for name in args.operations:
+            summary = measure(operations[name], args.iterations, args.warmup, after)
+            summary.update(size=size, layer=layer, operation=name)
+            results.append(summary)
+            print(f"{size:>9} {layer:>7} {name:>7}: {summary['ops_per_second']:9.1f} ops/s  "
+                  f"p50 {summary['p50_ms']:8.3f} ms  p99 {summary['p99_ms']:8.3f} ms", flush=True)
+
+        if layer == 'service':
+            session.close()
+            engine.dispose()
+    return results
+
+def git_revision():
+    """Current git commit of the repository, if available"""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark persona reads and writes through the service and API")
+    parser.add_argument("--sizes", default="1000,100000", help="Comma-separated database sizes (e.g. 1000,100000,1000000)")
+    parser.add_argument("--operations", default=",".join(OPERATIONS), help="Comma-separated operations to run")
+    parser.add_argument("--layers", default=",".join(LAYERS), help="Comma-separated layers: service, api")
+    parser.add_argument("--iterations", type=int, default=500, help="Timed calls per operation")
+    parser.add_argument("--warmup", type=int, default=50, help="Untimed calls per operation")
+    parser.add_argument("--per-page", type=int, default=20, help="Page size for list")
+    parser.add_argument("--cache", action="store_true", help="Keep the persona cache on for the API layer")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for ids and payloads")
+    parser.add_argument("--data-dir", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "data"),
+                        help="Where seeded databases are kept between runs")
+    parser.add_argument("--output", default="benchmark-results.json", help="JSON results file")
+    args = parser.parse_args()
+
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+    args.operations = args.operations.split(",")
+    args.layers = args.layers.split(",")
+    unknown = set(args.operations) - set(OPERATIONS) | set(args.layers) - set(LAYERS)
+    if unknown:
+        parser.error(f"Unknown operations or layers: {', '.join(sorted(unknown))}")
+    os.makedirs(args.data_dir, exist_ok=True)
+
+    scratch_dir = tempfile.mkdtemp(prefix="persona-bench-")
+    try:
+        results = []
+        for size in args.sizes:
+            results.extend(run_size(size, args, scratch_dir))
+    finally:
+        shutil.rmtree(scratch_dir, ignore_errors=True)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'git_revision': git_revision(),
+            'python': platform.python_version(),
+            'sqlalchemy': sqlalchemy.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'iterations': args.iterations,
+            'warmup': args.warmup,
+            'per_page': args.per_page,
+            'persona_cache': args.cache,
+            'json_codec': config.JSON_CODEC,
+            'attribute_storage_format': config.ATTRIBUTE_STORAGE_FORMAT,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Compare concurrent read/write throughput with and without the SQLite profile.
+
+Each run seeds a fresh database file, then starts worker processes (like
+gunicorn workers) that read personas and PATCH attributes for a fixed time.
+The profile is set per connection, except journal_mode=WAL, which stays on
+the database file, so the baseline gets its own file.
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from common import percentile, seed_personas
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from app.database import make_engine
+from app.models import Base
+from app.services import PersonaService
+
+def make_session(db_uri, profile):
+    """Open a session on a new engine, with or without the SQLite profile"""
+    engine = make_engine(db_uri, None if profile else {'SQLITE_PROFILE_ENABLED': False})
+    return sessionmaker(bind=engine)()
+
+def seed(db_uri, personas):
+    """Create the schema and insert personas built from the default templates"""
+    session = make_session(db_uri, profile=True)
+    Base.metadata.create_all(session.get_bind())
+    seed_personas(PersonaService(session), personas)
+    session.close()
+
+def worker(db_uri, profile, personas, duration, write_ratio, seed_value, results):
+    """Mix reads and attribute PATCHes until duration has passed"""
+    rng = random.Random(seed_value)
+    service = PersonaService(make_session(db_uri, profile))
+    reads = writes = errors = 0
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        persona_id = rng.randint(1, personas)
+        started = time.perf_counter()
+        try:
+            if rng.random() < write_ratio:
+                service.patch_attribute_data(persona_id, 'contextual',
+                                             {'weather': rng.choice(['sunny', 'rainy', 'cloudy'])})
+                writes += 1
+            else:
+                service.get_persona_by_id(persona_id).to_dict()
+                reads += 1
+            service.session.rollback()
+            latencies.append(time.perf_counter() - started)
+        except OperationalError:
+            # "database is locked" once the busy timeout runs out
+            service.session.rollback()
+            errors += 1
+    service.session.close()
+    results.put((reads, writes, errors, latencies))
+
+def run(profile, args):
+    """Run one benchmark configuration and return its totals"""
+    with tempfile.TemporaryDirectory() as directory:
+        db_uri = f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        seed(db_uri, args.personas)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=worker, args=(db_uri, profile, args.personas, args.duration,
+                                                         args.write_ratio, i, results))
+            for i in range(args.workers)
+        ]
+        for process in processes:
+            process.start()
+        totals = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+    reads = sum(total[0] for total in totals)
+    writes = sum(total[1] for total in totals)
+    errors = sum(total[2] for total in totals)
+    latencies = sorted(latency for total in totals for latency in total[3])
+    return reads, writes, errors, latencies
+
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Benchmark the SQLite connection profile")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent worker processes")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per configuration")
+    parser.add_argument("--personas", type=int, default=2000, help="Personas in the database")
+    parser.add_argument("--write-ratio", type=float, default=0.2, help="Fraction of operations that write")
+    args = parser.parse_args()
+
+    for label, profile in (("no profile", False), ("profile", True)):
+        reads, writes, errors, latencies = run(profile, args)
+        print(f"{label:>10}: {reads / args.duration:8.0f} reads/s  "
+              f"{writes / args.duration:7.0f} writes/s  "
+              f"p50 {percentile(latencies, 0.5) * 1000:6.1f} ms  "
+              f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms  {errors} lock errors")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic personas at scale for load testing.
+
+Demographics and attribute values are sampled with NumPy. Countries and
+languages come from config.REGION_LANGUAGE_MAP, with locations scattered
+around each country's geolocation. Attribute fields with an options list in
+PERSONA_FIELD_CONFIG are sampled from that list. Other fields are sampled
+from the values used in the add_default_personas.py templates.
+
+Work is split into chunks, and each chunk is generated in a process pool
+from its own seed derived from --seed. The output is the same for a given
+--seed and --chunk-size no matter how many workers are used. Records are
+serialized from pre-encoded JSON fragments rather than through json.dumps
+per persona.
+
+Output is NDJSON in the shape POST /api/v1/personas and import_personas.py
+accept, or rows written straight into the database, including the attribute
+value index. NumPy is required: pip install numpy
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from sqlalchemy import func, insert
+import persona_field_config
+from add_default_personas import DEFAULT_PERSONAS
+from app import codec, storage
+from app.models import (
+    init_db, AttributeCategory, DemographicData, Persona, PersonaAttributes, PersonaAttributeValue
+)
+from app.validation import get_compiled_config
+from config import REGION_LANGUAGE_MAP
+
+CATEGORIES = ['psychographic', 'behavioral', 'contextual']
+
+DEMOGRAPHIC_COLUMNS = ('latitude', 'longitude', 'language', 'country', 'city', 'region',
+                       'age', 'gender', 'education', 'income', 'occupation')
+
+# Distinct values sampled per list-valued field and chunk; personas pick one of them
+LIST_COMBINATIONS = 1024
+
+# Standard deviation in degrees of generated locations around a country's geolocation
+LOCATION_SPREAD = 4.0
+
+def _fragments(values):
+    """Pre-encode values as JSON text"""
+    return [json.dumps(value, ensure_ascii=False, separators=(',', ':')) for value in values]
+
+def _unique(values):
+    """Values in first-seen order without duplicates (values may be unhashable)"""
+    seen = []
+    for value in values:
+        if value not in seen:
+            seen.append(value)
+    return seen
+
+def build_vocabulary():
+    """
+    Collect the value pools that personas are sampled from
+
+    Returns:
+        dict: Demographic value pools, and value pools with their JSON fragments for every configured field
+    """
+    templates = DEFAULT_PERSONAS
+    countries = list(REGION_LANGUAGE_MAP)
+    places = {}
+    for country in countries:
+        # Cities and regions from templates in the same country, else just the country
+        matches = [t['demographic'] for t in templates if t['demographic'].get('country') == country]
+        places[country] = [(d.get('city'), d.get('region')) for d in matches] or [(None, None)]
+
+    names = [t['name'].split(' ', 1) for t in templates]
+    vocabulary = {
+        'countries': countries,
+        'languages': [REGION_LANGUAGE_MAP[c]['language'] for c in countries],
+        'centers': np.array([[float(part) for part in REGION_LANGUAGE_MAP[c]['geolocation'].split(',')]
+                             for c in countries]),
+        'cities': [[city for city, _ in places[c]] for c in countries],
+        'regions': [[region for _, region in places[c]] for c in countries],
+        'first_names': _unique(name[0] for name in names),
+        'last_names': _unique(name[-1] for name in names),
+        'demographic': {
+            field: _unique(t['demographic'].get(field) for t in templates)
+            for field in ('gender', 'education', 'income', 'occupation')
+        },
+        'fields': {},
+    }
+
+    compiled = get_compiled_config()
+    for category in CATEGORIES:
+        fields = []
+        for field_def in persona_field_config.PERSONA_FIELD_CONFIG[category]['fields']:
+            name = field_def['name']
+            field_type = field_def.get('type')
+            if field_def.get('options'):
+                pool = list(field_def['options'])
+            elif field_type == 'list':
+                pool = _unique(value for t in templates for value in t.get(category, {}).get(name, []))
+            else:
+                pool = _unique(t[category][name] for t in templates if name in t.get(category, {}))
+            if not pool:
+                continue
+            fields.append({
+                'name': name,
+                'key': json.dumps(name),
+                'list': field_type == 'list',
+                'indexed': name in compiled.indexed_fields.get(category, ()),
+                'values': pool,
+                'fragments': _fragments(pool),
+            })
+        vocabulary['fields'][category] = fields
+    return vocabulary
+
+_vocabulary = None
+
+def _get_vocabulary():
+    """Vocabulary for this process, built once"""
+    global _vocabulary
+    if _vocabulary is None:
+        _vocabulary = build_vocabulary()
+    return _vocabulary
+
+def sample_chunk(seed, chunk_index, size):
+    """
+    Sample the values of one chunk of personas
+
+    Sampling is vectorized; the columns are then converted to Python lists,
+    which are much cheaper to index row by row than NumPy arrays.
+
+    Returns:
+        dict: Index lists into the vocabulary pools, and numeric columns
+    """
+    vocabulary = _get_vocabulary()
+    rng = np.random.default_rng([seed, chunk_index])
+    countries = rng.integers(0, len(vocabulary['countries']), size)
+    locations = vocabulary['centers'][countries] + rng.normal(0.0, LOCATION_SPREAD, (size, 2))
+    sample = {
+        'countries': countries.tolist(),
+        'place': rng.integers(0, 1 << 30, size).tolist(),
+        'latitude': np.clip(locations[:, 0], -90.0, 90.0).round(4).tolist(),
+        'longitude': ((locations[:, 1] + 180.0) % 360.0 - 180.0).round(4).tolist(),
+        'age': np.clip(rng.normal(38.0, 13.0, size), 18, 90).astype(np.int64).tolist(),
+        'first_name': rng.integers(0, len(vocabulary['first_names']), size).tolist(),
+        'last_name': rng.integers(0, len(vocabulary['last_names']), size).tolist(),
+        'demographic': {
+            field: rng.integers(0, len(pool), size).tolist() for field, pool in vocabulary['demographic'].items()
+        },
+        'fields': {},
+    }
+    for category, fields in vocabulary['fields'].items():
+        for field in fields:
+            pool_size = len(field['values'])
+            if field['list']:
+                # Random permutation prefixes give lists of 1-4 distinct values. A
+                # chunk's personas share LIST_COMBINATIONS such lists, so each list
+                # is built and encoded once rather than once per persona
+                picks = np.argsort(rng.random((LIST_COMBINATIONS, pool_size)), axis=1)[:, :min(4, pool_size)]
+                lengths = rng.integers(1, min(4, pool_size) + 1, LIST_COMBINATIONS)
+                combinations = [row[:length] for row, length in zip(picks.tolist(), lengths.tolist())]
+                sample['fields'][(category, field['name'])] = (
+                    combinations, rng.integers(0, LIST_COMBINATIONS, size).tolist()
+                )
+            else:
+                sample['fields'][(category, field['name'])] = rng.integers(0, pool_size, size).tolist()
+    return sample
+
+def _json_column(values):
+    """JSON text of every value in a column, encoding each distinct value once"""
+    encoded = {}
+    column = []
+    for value in values:
+        text = encoded.get(value)
+        if text is None:
+            text = encoded[value] = json.dumps(value, ensure_ascii=False)
+        column.append(text)
+    return column
+
+def _field_column(field, picked):
+    """JSON text of one attribute field for every persona of a chunk"""
+    fragments = field['fragments']
+    if field['list']:
+        combinations, choices = picked
+        encoded = ['[' + ','.join([fragments[i] for i in picks]) + ']' for picks in combinations]
+        return [encoded[choice] for choice in choices]
+    return [fragments[i] for i in picked]
+
+def category_column(vocabulary, sample, category):
+    """JSON text of one attribute category for every persona of a chunk"""
+    fields = vocabulary['fields'][category]
+    template = '{' + ','.join(field['key'].replace('%', '%%') + ':%s' for field in fields) + '}'
+    columns = [_field_column(field, sample['fields'][(category, field['name'])]) for field in fields]
+    return [template % values for values in zip(*columns)]
+
+def indexed_values(vocabulary, sample, category):
+    """(row, field, value) entries of the list-valued fields, for the attribute value index"""
+    entries = []
+    for field in vocabulary['fields'][category]:
+        if field['indexed']:
+            values = field['values']
+            name = field['name']
+            combinations, choices = sample['fields'][(category, name)]
+            listed = [[str(values[i]) for i in picks] for picks in combinations]
+            for row, choice in enumerate(choices):
+                entries.extend((row, name, value) for value in listed[choice])
+    return entries
+
+def demographic_columns(vocabulary, sample):
+    """Demographic values for every persona of a chunk, keyed by column name"""
+    countries = sample['countries']
+    places = [place % len(vocabulary['cities'][country]) for country, place in zip(countries, sample['place'])]
+    columns = {
+        'latitude': sample['latitude'],
+        'longitude': sample['longitude'],
+        'language': [vocabulary['languages'][country] for country in countries],
+        'country': [vocabulary['countries'][country] for country in countries],
+        'city': [vocabulary['cities'][country][place] for country, place in zip(countries, places)],
+        'region': [vocabulary['regions'][country][place] for country, place in zip(countries, places)],
+        'age': sample['age'],
+    }
+    for field, pool in vocabulary['demographic'].items():
+        columns[field] = [pool[i] for i in sample['demographic'][field]]
+    return columns
+
+def name_column(vocabulary, sample, start, encoded=False):
+    """Unique display names for every persona of a chunk, optionally as JSON text"""
+    first_names = vocabulary['first_names']
+    last_names = vocabulary['last_names']
+    if not encoded:
+        return [f"{first_names[first]} {last_names[last]} {number}"
+                for number, (first, last) in enumerate(zip(sample['first_name'], sample['last_name']), start)]
+    # The names only differ in the number, so encode each first/last name pair once
+    prefixes = [[json.dumps(f"{first} {last} ", ensure_ascii=False)[:-1] for last in last_names]
+                for first in first_names]
+    return [f'{prefixes[first][last]}{number}"'
+            for number, (first, last) in enumerate(zip(sample['first_name'], sample['last_name']), start)]
+
+def generate_ndjson_chunk(task):
+    """Generate one chunk of personas as NDJSON bytes"""
+    seed, chunk_index, start, size = task
+    vocabulary = _get_vocabulary()
+    sample = sample_chunk(seed, chunk_index, size)
+    demographic = demographic_columns(vocabulary, sample)
+    demographic_json = [
+        '{"latitude":%r,"longitude":%r,"language":%s,"country":%s,"city":%s,"region":%s,"age":%d,'
+        '"gender":%s,"education":%s,"income":%s,"occupation":%s}' % values
+        for values in zip(demographic['latitude'], demographic['longitude'],
+                          *(_json_column(demographic[column]) for column in ('language', 'country', 'city', 'region')),
+                          demographic['age'],
+                          *(_json_column(demographic[column]) for column in ('gender', 'education', 'income', 'occupation')))
+    ]
+    lines = [
+        '{"name":%s,"demographic":%s,"psychographic":%s,"behavioral":%s,"contextual":%s}' % values
+        for values in zip(name_column(vocabulary, sample, start, encoded=True), demographic_json,
+                          *(category_column(vocabulary, sample, category) for category in CATEGORIES))
+    ]
+    return ('\n'.join(lines) + '\n').encode()
+
+def generate_row_chunk(task):
+    """
+    Generate one chunk of personas as table rows
+
+    Persona positions within the chunk stand in for ids; the writer adds the
+    chunk's first id.
+    """
+    seed, chunk_index, start, size = task
+    vocabulary = _get_vocabulary()
+    sample = sample_chunk(seed, chunk_index, size)
+    demographic = demographic_columns(vocabulary, sample)
+    return (
+        name_column(vocabulary, sample, start),
+        list(zip(*(demographic[column] for column in DEMOGRAPHIC_COLUMNS))),
+        {category: category_column(vocabulary, sample, category) for category in CATEGORIES},
+        {category: indexed_values(vocabulary, sample, category) for category in CATEGORIES},
+    )
+
+def _db_value(connection, column, value):
+    """value as the driver expects it for column"""
+    processor = column.type.bind_processor(connection.dialect)
+    return processor(value) if processor else value
+
+def _insert_rows(connection, table, columns, rows):
+    """
+    executemany rows (tuples in columns order, already in database form)
+
+    Skips SQLAlchemy's per-row parameter processing, which costs more than
+    the INSERT itself at this volume.
+    """
+    compiled = insert(table).compile(dialect=connection.dialect, column_keys=columns)
+    if compiled.positional:
+        order = [columns.index(key) for key in compiled.positiontup]
+        if order != list(range(len(columns))):
+            rows = [tuple(row[i] for i in order) for row in rows]
+    else:
+        rows = [dict(zip(columns, row)) for row in rows]
+    connection.exec_driver_sql(compiled.string, rows)
+
+def write_rows(session, next_id, chunk):
+    """Insert one generated chunk in a single transaction, returning the next free persona id"""
+    names, demographics, attributes, values = chunk
+    connection = session.connection()
+    persona_table = Persona.__table__
+    now = _db_value(connection, persona_table.c.created_at, datetime.utcnow())
+    _insert_rows(connection, persona_table, ['id', 'name', 'created_at', 'updated_at'],
+                 [(persona_id, name, now, now) for persona_id, name in enumerate(names, next_id)])
+    _insert_rows(connection, DemographicData.__table__, ['persona_id'] + list(DEMOGRAPHIC_COLUMNS),
+                 [(persona_id,) + tuple(demographic) for persona_id, demographic in enumerate(demographics, next_id)])
+
+    attribute_table = PersonaAttributes.__table__
+    value_table = PersonaAttributeValue.__table__
+    attribute_rows = []
+    value_rows = []
+    compress = storage.write_format() != storage.JSON
+    for category in CATEGORIES:
+        member = _db_value(connection, attribute_table.c.category, AttributeCategory(category))
+        for persona_id, data in enumerate(attributes[category], next_id):
+            if compress:
+                encoding, stored, packed = storage.encode(codec.loads(data))
+            else:
+                encoding, stored, packed = storage.JSON, data, None
+            attribute_rows.append((persona_id, member, encoding, stored, packed))
+        value_rows.extend((next_id + row, member, field, value) for row, field, value in values[category])
+    _insert_rows(connection, attribute_table, ['persona_id', 'category', 'encoding', 'data', 'packed'],
+                 attribute_rows)
+    if value_rows:
+        _insert_rows(connection, value_table, ['persona_id', 'category', 'field', 'value'], value_rows)
+    session.commit()
+    return next_id + len(names)
+
+def chunk_tasks(count, seed, chunk_size):
+    """(seed, chunk_index, start, size) for every chunk"""
+    return [(seed, index, start, min(chunk_size, count - start))
+            for index, start in enumerate(range(0, count, chunk_size))]
+
+def generate(count, seed=0, chunk_size=20000, workers=None, output=None, database_uri=None):
+    """
+    Generate count personas into an NDJSON file or the database
+
+    Returns:
+        float: Seconds taken
+    """
+    tasks = chunk_tasks(count, seed, chunk_size)
+    worker = generate_ndjson_chunk if output else generate_row_chunk
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    done = 0
+
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    results = pool.imap(worker, tasks) if pool else map(worker, tasks)
+    try:
+        if output:
+            with open(output, 'wb') as file:
+                for task, data in zip(tasks, results):
+                    file.write(data)
+                    done += task[3]
+                    _report(done, count, started)
+        else:
+            session = init_db(database_uri)
+            try:
+                next_id = (session.query(func.max(Persona.id)).scalar() or 0) + 1
+                for task, chunk in zip(tasks, results):
+                    next_id = write_rows(session, next_id, chunk)
+                    done += task[3]
+                    _report(done, count, started)
+            finally:
+                session.close()
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+    return time.perf_counter() - started
+
+def _report(done, count, started):
+    """Print progress"""
+    elapsed = time.perf_counter() - started
+    print(f"Generated {done}/{count} personas ({done / elapsed:.0f} rows/s)", flush=True)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate synthetic personas for load testing")
+    parser.add_argument("count", type=int, help="Number of personas to generate")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0)")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Personas per chunk of work")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count)")
+    parser.add_argument("--output", help="Write NDJSON to this file instead of the database")
+    parser.add_argument("--database-uri", help="Database URI (default: app configuration)")
+    args = parser.parse_args()
+
+    if np is None:
+        print("generate_personas.py needs NumPy: pip install numpy")
+        return 1
+    if args.count < 1 or args.chunk_size < 1:
+        parser.error("count and --chunk-size must be positive")
+
+    elapsed = generate(args.count, seed=args.seed, chunk_size=args.chunk_size, workers=args.workers,
+                       output=args.output, database_uri=args.database_uri)
+    print(f"Generated {args.count} personas in {elapsed:.1f}s ({args.count / elapsed:.0f} rows/s)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
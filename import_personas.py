@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Bulk import personas from an NDJSON or CSV file.
+
+Records are read in batches, validated against persona_field_config and
+inserted with PersonaService.bulk_create_personas, committing once per batch.
+Malformed records are counted as rejected and never stop the import. After
+every commit the position in the file is saved to a checkpoint, so an
+interrupted or failed import can be continued with --resume. A crash between
+a commit and its checkpoint write re-imports at most that one batch.
+
+NDJSON files hold one persona object per line, in the same shape the API
+accepts. CSV files need a 'name' column; demographic fields go in
+'demographic.<field>' columns and attribute fields in '<category>.<field>'
+columns holding JSON values, or a '<category>' column holding a JSON object.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import init_db
+from app.services import PersonaService, CATEGORIES, validate_persona_shape
+
+DEMOGRAPHIC_TYPES = {'latitude': float, 'longitude': float, 'age': int}
+
+def parse_json_value(value):
+    """Decode a CSV cell as JSON, falling back to the raw string"""
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+def csv_row_to_persona(row):
+    """Convert a flat CSV row into a nested persona payload"""
+    persona = {}
+    for column, value in row.items():
+        if column is None or value is None or value == '':
+            continue
+        if column == 'name':
+            persona['name'] = value
+        elif column in CATEGORIES:
+            persona.setdefault(column, {}).update(json.loads(value))
+        elif '.' in column:
+            section, field = column.split('.', 1)
+            if section == 'demographic':
+                convert = DEMOGRAPHIC_TYPES.get(field, str)
+                persona.setdefault('demographic', {})[field] = convert(value)
+            elif section in CATEGORIES:
+                persona.setdefault(section, {})[field] = parse_json_value(value)
+    return persona
+
+def check_record(persona):
+    """Return persona, or a rejection if its name or demographic data is malformed"""
+    is_valid, error = validate_persona_shape(persona)
+    if is_valid:
+        return persona
+    return {'_error': error if isinstance(error, str) else '; '.join(error)}
+
+def count_lines(path, offset):
+    """Number of lines in the first offset bytes of a file"""
+    lines = 0
+    with open(path, 'rb') as file:
+        while offset > 0:
+            chunk = file.read(min(offset, 1 << 20))
+            if not chunk:
+                break
+            lines += chunk.count(b'\n')
+            offset -= len(chunk)
+    return lines
+
+def read_ndjson(path, offset):
+    """
+    Yield (persona, position, location) for each record
+
+    position is the byte offset after the record and location its line
+    number in the file, for error messages.
+    """
+    line_number = count_lines(path, offset) if offset else 0
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        for line in iter(file.readline, b''):
+            position = file.tell()
+            line_number += 1
+            if not line.strip():
+                continue
+            location = f'line {line_number}'
+            try:
+                persona = json.loads(line)
+            except ValueError as e:
+                yield {'_error': str(e)}, position, location
+            else:
+                yield check_record(persona), position, location
+
+def read_csv(path, offset):
+    """
+    Yield (persona, position, location) for each record
+
+    position is the number of records read and location the line the
+    record ends on, for error messages.
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as file:
+        reader = csv.DictReader(file)
+        for position, row in enumerate(reader, start=1):
+            if position <= offset:
+                continue
+            location = f'line {reader.line_num}'
+            try:
+                persona = csv_row_to_persona(row)
+            except (ValueError, TypeError) as e:
+                yield {'_error': str(e)}, position, location
+            else:
+                yield check_record(persona), position, location
+
+def load_checkpoint(checkpoint_path, source_path):
+    """Return the saved position and counters for source_path, if any"""
+    if not os.path.exists(checkpoint_path):
+        return {'position': 0, 'created': 0, 'rejected': 0}
+    with open(checkpoint_path, 'r') as file:
+        checkpoint = json.load(file)
+    if checkpoint.get('source') != os.path.abspath(source_path):
+        raise ValueError(f"Checkpoint {checkpoint_path} belongs to {checkpoint.get('source')}")
+    return checkpoint
+
+def save_checkpoint(checkpoint_path, source_path, position, created, rejected):
+    """Atomically record the position after the last committed batch"""
+    tmp_path = checkpoint_path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump({
+            'source': os.path.abspath(source_path),
+            'position': position,
+            'created': created,
+            'rejected': rejected
+        }, file)
+    os.replace(tmp_path, checkpoint_path)
+
+def import_personas(session, path, file_format, batch_size=1000, checkpoint_path=None,
+                    resume=False, max_error_lines=20):
+    """
+    Import personas from path in batches
+
+    Returns:
+        tuple: (created, rejected) counts, including those of a resumed run
+    """
+    checkpoint_path = checkpoint_path or path + '.checkpoint'
+    checkpoint = load_checkpoint(checkpoint_path, path) if resume else {'position': 0, 'created': 0, 'rejected': 0}
+    created, rejected = checkpoint['created'], checkpoint['rejected']
+    if checkpoint['position']:
+        print(f"Resuming {path} from position {checkpoint['position']} ({created} already imported)")
+
+    reader = read_ndjson if file_format == 'ndjson' else read_csv
+    service = PersonaService(session)
+    started = time.perf_counter()
+    run_created = 0
+    errors_printed = 0
+    batch = []
+    position = checkpoint['position']
+
+    def flush(batch, position):
+        nonlocal created, rejected, run_created, errors_printed
+        # Messages by position in the batch, so they print in file order
+        messages = {}
+        item_owners = []
+        items = []
+        for batch_index, (persona, location) in enumerate(batch):
+            if '_error' in persona:
+                messages[batch_index] = f"{location}: {persona['_error']}"
+            else:
+                item_owners.append(batch_index)
+                items.append(persona)
+        try:
+            result = service.bulk_create_personas(items) if items else {'created': [], 'errors': []}
+        except SQLAlchemyError:
+            # Nothing of this batch was committed, so the checkpoint stays
+            # at the end of the previous one
+            session.rollback()
+            raise
+
+        created += len(result['created'])
+        run_created += len(result['created'])
+        for error in result['errors']:
+            batch_index = item_owners[error['index']]
+            messages[batch_index] = f"{batch[batch_index][1]}: {error['error']} {error.get('details') or ''}".strip()
+        rejected += len(messages)
+        save_checkpoint(checkpoint_path, path, position, created, rejected)
+
+        for batch_index in sorted(messages):
+            if errors_printed < max_error_lines:
+                print(f"  Rejected: {messages[batch_index]}")
+            errors_printed += 1
+
+        elapsed = time.perf_counter() - started
+        print(f"Imported {created} personas ({rejected} rejected), "
+              f"{run_created / elapsed if elapsed else 0:,.0f} rows/s")
+
+    for persona, position, location in reader(path, checkpoint['position']):
+        batch.append((persona, location))
+        if len(batch) >= batch_size:
+            flush(batch, position)
+            batch = []
+    if batch:
+        flush(batch, position)
+
+    return created, rejected
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Bulk import personas from an NDJSON or CSV file")
+    parser.add_argument("path", help="NDJSON (.ndjson/.jsonl) or CSV file to import")
+    parser.add_argument("--format", choices=["ndjson", "csv"], help="File format (default: from extension)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Personas inserted per transaction")
+    parser.add_argument("--database-uri", help="Database URI (default: app configuration)")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: <path>.checkpoint)")
+    parser.add_argument("--resume", action="store_true", help="Continue from the checkpoint of a previous run")
+    args = parser.parse_args()
+
+    file_format = args.format or ('csv' if args.path.lower().endswith('.csv') else 'ndjson')
+    if args.batch_size < 1:
+        parser.error("--batch-size must be positive")
+
+    session = init_db(args.database_uri)
+    try:
+        created, rejected = import_personas(session, args.path, file_format,
+                                            batch_size=args.batch_size,
+                                            checkpoint_path=args.checkpoint,
+                                            resume=args.resume)
+    except (OSError, ValueError) as e:
+        print(f"Import failed: {str(e)}")
+        return 1
+    except SQLAlchemyError as e:
+        print(f"Import failed: {str(e)}")
+        print("Batches before the failure are committed; run again with --resume to continue")
+        return 1
+    finally:
+        session.close()
+
+    print(f"Import finished: {created} created, {rejected} rejected")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -30,7 +30,7 @@ def create_data_directory():
 def validate_database(engine):
     """Validate that all required tables were created"""
     inspector = inspect(engine)
-    required_tables = ['personas', 'demographic_data', 'persona_attributes']
+    required_tables = ['personas', 'demographic_data', 'persona_attributes', 'persona_attribute_values']
     
     existing_tables = inspector.get_table_names()
     print(f"Existing tables: {', '.join(existing_tables)}")
@@ -117,6 +117,26 @@ def add_default_personas():
         traceback.print_exc()
         return False
 
+def backfill_attribute_index():
+    """Build the attribute value index if it is empty but attributes exist"""
+    try:
+        from app.services import PersonaService
+
+        session = init_db()
+        indexed = session.execute(text("SELECT COUNT(*) FROM persona_attribute_values")).scalar()
+        attributes = session.execute(text("SELECT COUNT(*) FROM persona_attributes")).scalar()
+        if indexed or not attributes:
+            return True
+
+        print("Building attribute value index for existing personas...")
+        entries = PersonaService(session).rebuild_attribute_index()
+        print(f"Indexed {entries} attribute values.")
+        return True
+    except Exception as e:
+        print(f"Error building attribute value index: {str(e)}")
+        traceback.print_exc()
+        return False
+
 def main():
     """Main function to initialize the database"""
     print("Starting database initialization...")
@@ -145,6 +165,8 @@ def main():
             print("Failed to add default personas.")
     else:
         print("Database already contains personas. Skipping default persona creation.")
+        if not backfill_attribute_index():
+            print("Failed to build attribute value index.")
     
     sys.exit(0)
 
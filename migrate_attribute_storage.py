@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Convert stored persona attribute data to another storage encoding.
+
+Rows are rewritten in small primary-key chunks, each committed on its own, so
+the service can keep running during the migration. A row is only rewritten if
+it still holds the value that was read, so concurrent API writes are never
+overwritten; rows changed in the meantime are skipped and picked up by a
+later run. The decoded data does not change, so updated_at, ETags and the
+attribute value index are left alone.
+
+Set ATTRIBUTE_STORAGE_FORMAT to the same encoding before or after running
+this, so rows written by the service use it as well.
+"""
+import argparse
+import sys
+import time
+import zlib
+from sqlalchemy import bindparam, select, text, update
+from app import storage
+from app.models import PersonaAttributes, init_db
+
+def migrate_attribute_storage(session, encoding, chunk_size=500, pause=0.0):
+    """
+    Rewrite attribute rows not stored in the given encoding
+
+    Returns:
+        tuple: (converted, skipped) row counts
+    """
+    table = PersonaAttributes.__table__
+    statement = (
+        update(table)
+        .where(table.c.id == bindparam('row_id'),
+               table.c.encoding == bindparam('old_encoding'),
+               table.c.data == bindparam('old_data'),
+               table.c.packed.is_not_distinct_from(bindparam('old_packed')))
+        .values(encoding=bindparam('new_encoding'),
+                data=bindparam('new_data'),
+                packed=bindparam('new_packed'))
+    )
+    exact_rowcount = session.get_bind().dialect.supports_sane_multi_rowcount
+
+    converted = 0
+    skipped = 0
+    last_id = 0
+    while True:
+        chunk = session.execute(
+            select(table.c.id, table.c.encoding, table.c.data, table.c.packed)
+            .where(table.c.id > last_id, table.c.encoding != encoding)
+            .order_by(table.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not chunk:
+            break
+
+        rows = []
+        for row_id, old_encoding, old_data, old_packed in chunk:
+            try:
+                decoded = storage.decode(old_encoding, old_data, old_packed)
+            except (TypeError, ValueError, zlib.error):
+                print(f"Skipping attribute row {row_id}: stored data cannot be decoded")
+                skipped += 1
+                continue
+            new_encoding, new_data, new_packed = storage.encode(decoded, encoding)
+            rows.append({
+                'row_id': row_id, 'old_encoding': old_encoding,
+                'old_data': old_data, 'old_packed': old_packed,
+                'new_encoding': new_encoding, 'new_data': new_data, 'new_packed': new_packed
+            })
+
+        if rows:
+            result = session.execute(statement, rows)
+            updated = result.rowcount if exact_rowcount else len(rows)
+            converted += updated
+            skipped += len(rows) - updated
+        session.commit()
+        last_id = chunk[-1][0]
+
+        print(f"Converted {converted} rows (last id {last_id})")
+        if pause:
+            time.sleep(pause)
+
+    return converted, skipped
+
+def storage_size(session):
+    """Total bytes of stored attribute data"""
+    table = PersonaAttributes.__table__
+    return session.execute(
+        text("SELECT COALESCE(SUM(LENGTH(data) + COALESCE(LENGTH(packed), 0)), 0) "
+             f"FROM {table.name}")
+    ).scalar()
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Convert persona attribute data to another storage encoding")
+    parser.add_argument("--to", choices=storage.FORMATS, default=storage.ZLIB_V1,
+                        help="Target encoding (default: %(default)s)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Rows converted per transaction")
+    parser.add_argument("--sleep", type=float, default=0.0, help="Seconds to pause between chunks")
+    parser.add_argument("--database-uri", help="Database URI (default: app configuration)")
+    parser.add_argument("--vacuum", action="store_true", help="Run VACUUM afterwards to return freed space (SQLite)")
+    args = parser.parse_args()
+
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+
+    session = init_db(args.database_uri)
+    try:
+        size_before = storage_size(session)
+        converted, skipped = migrate_attribute_storage(session, args.to,
+                                                       chunk_size=args.chunk_size,
+                                                       pause=args.sleep)
+        size_after = storage_size(session)
+        if args.vacuum and session.get_bind().dialect.name == 'sqlite':
+            session.close()
+            with session.get_bind().connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                connection.execute(text("VACUUM"))
+    finally:
+        session.close()
+
+    print(f"Migration finished: {converted} converted, {skipped} skipped")
+    print(f"Attribute data size: {size_before} -> {size_after} bytes")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
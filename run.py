@@ -3,6 +3,7 @@
 Entry point for running the Persona Service
 """
 import argparse
+import sys
 from app import create_app
 
 if __name__ == "__main__":
@@ -10,8 +11,20 @@ if __name__ == "__main__":
     parser.add_argument("--host", default="0.0.0.0", help="Host to run the server on")
     parser.add_argument("--port", type=int, default=5050, help="Port to run the server on")
     parser.add_argument("--debug", action="store_true", help="Run in debug mode")
+    parser.add_argument("--asgi", action="store_true",
+                        help="Serve through the async ASGI mode with uvicorn (see app/asgi.py)")
 
     args = parser.parse_args()
 
-    app = create_app()
-    app.run(host=args.host, port=args.port, debug=args.debug)
+    if args.asgi:
+        try:
+            import uvicorn
+        except ImportError:
+            print("The ASGI mode needs uvicorn and an async database driver: pip install uvicorn aiosqlite")
+            sys.exit(1)
+        from app.asgi import create_asgi_app
+        uvicorn.run(create_asgi_app(), host=args.host, port=args.port,
+                    log_level="debug" if args.debug else "info")
+    else:
+        app = create_app()
+        app.run(host=args.host, port=args.port, debug=args.debug)
@@ -0,0 +1,23 @@
+"""
+Shared fixtures: an app on a fresh SQLite database per test
+"""
+import pytest
+from app import create_app
+from app.models import init_db
+
+@pytest.fixture
+def app(tmp_path):
+    """Application on an initialized, empty database"""
+    uri = f"sqlite:///{tmp_path / 'personas.db'}"
+    init_db(uri).close()
+    return create_app({
+        'SQLALCHEMY_DATABASE_URI': uri,
+        'TESTING': True,
+        'PERSONA_CACHE_SIZE': 0,
+        'METRICS_ENABLED': False,
+    })
+
+@pytest.fixture
+def client(app):
+    """Test client for the application"""
+    return app.test_client()
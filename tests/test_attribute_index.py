@@ -0,0 +1,77 @@
+"""
+Tests that the attribute value index (persona_attribute_values) follows writes
+"""
+import pytest
+from sqlalchemy import select
+from app.extensions import db
+from app.models import PersonaAttributeValue
+
+def index_rows(app, persona_id):
+    """The persona's (category, field, value) rows in the index"""
+    with app.app_context():
+        rows = db.session.execute(
+            select(PersonaAttributeValue.category, PersonaAttributeValue.field, PersonaAttributeValue.value)
+            .where(PersonaAttributeValue.persona_id == persona_id)
+        ).all()
+        return sorted((category.value, field, value) for category, field, value in rows)
+
+def filtered_ids(client, **params):
+    """IDs returned by the list endpoint for the given filters"""
+    body = client.get('/api/v1/personas', query_string=params).get_json()
+    return sorted(persona['id'] for persona in body['personas'])
+
+@pytest.fixture
+def persona_id(client):
+    response = client.post('/api/v1/personas', json={
+        'name': 'indexed',
+        'psychographic': {'interests': ['hiking', 'jazz'], 'lifestyle': 'active'},
+        'behavioral': {'browsing_habits': ['news']},
+    })
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+def test_create_indexes_list_fields(app, persona_id):
+    assert index_rows(app, persona_id) == [
+        ('behavioral', 'browsing_habits', 'news'),
+        ('psychographic', 'interests', 'hiking'),
+        ('psychographic', 'interests', 'jazz'),
+    ]
+
+def test_put_persona_replaces_index_rows(app, client, persona_id):
+    response = client.put(f'/api/v1/personas/{persona_id}', json={
+        'psychographic': {'interests': ['chess']},
+    })
+
+    assert response.status_code == 200
+    assert index_rows(app, persona_id) == [
+        ('behavioral', 'browsing_habits', 'news'),
+        ('psychographic', 'interests', 'chess'),
+    ]
+    assert filtered_ids(client, **{'psychographic.interests': 'hiking'}) == []
+    assert filtered_ids(client, **{'psychographic.interests': 'chess'}) == [persona_id]
+
+@pytest.mark.parametrize('method', ['PUT', 'PATCH'])
+def test_attribute_update_reindexes_changed_fields(app, client, persona_id, method):
+    response = client.open(f'/api/v1/personas/{persona_id}/attributes/psychographic', method=method,
+                           json={'interests': ['sailing', 'jazz']})
+
+    assert response.status_code == 200
+    assert index_rows(app, persona_id) == [
+        ('behavioral', 'browsing_habits', 'news'),
+        ('psychographic', 'interests', 'jazz'),
+        ('psychographic', 'interests', 'sailing'),
+    ]
+    assert filtered_ids(client, **{'psychographic.interests': 'sailing'}) == [persona_id]
+
+def test_attribute_patch_of_other_fields_keeps_index_rows(app, client, persona_id):
+    response = client.patch(f'/api/v1/personas/{persona_id}/attributes/psychographic',
+                            json={'lifestyle': 'relaxed'})
+
+    assert response.status_code == 200
+    assert ('psychographic', 'interests', 'hiking') in index_rows(app, persona_id)
+
+def test_delete_removes_index_rows(app, client, persona_id):
+    assert client.delete(f'/api/v1/personas/{persona_id}').status_code == 200
+
+    assert index_rows(app, persona_id) == []
+    assert filtered_ids(client, **{'psychographic.interests': 'jazz'}) == []
@@ -0,0 +1,61 @@
+"""
+Tests for batch GET: GET /api/v1/personas?ids= and POST /api/v1/personas:batchGet
+"""
+import pytest
+
+@pytest.fixture
+def persona_ids(client):
+    response = client.post('/api/v1/personas/bulk', json=[{'name': f'persona {index}'} for index in range(3)])
+    assert response.status_code == 201
+    return [entry['id'] for entry in response.get_json()['created']]
+
+def test_returns_personas_in_requested_order(client, persona_ids):
+    ids = list(reversed(persona_ids))
+    body = client.post('/api/v1/personas:batchGet', json={'ids': ids}).get_json()
+
+    assert body['count'] == 3
+    assert body['missing'] == []
+    assert [persona['id'] for persona in body['personas']] == ids
+
+def test_missing_ids_are_listed(client, persona_ids):
+    body = client.get(f'/api/v1/personas?ids={persona_ids[0]},999,{persona_ids[1]},1000').get_json()
+
+    assert [persona['id'] for persona in body['personas']] == persona_ids[:2]
+    assert body['missing'] == [999, 1000]
+
+def test_duplicate_ids_are_returned_once(client, persona_ids):
+    first = persona_ids[0]
+    body = client.post('/api/v1/personas:batchGet', json=[first, str(first), first, 999, 999]).get_json()
+
+    assert [persona['id'] for persona in body['personas']] == [first]
+    assert body['missing'] == [999]
+
+def test_repeated_ids_parameter(client, persona_ids):
+    query = '&'.join(f'ids={persona_id}' for persona_id in persona_ids)
+    body = client.get(f'/api/v1/personas?{query}').get_json()
+
+    assert [persona['id'] for persona in body['personas']] == persona_ids
+
+@pytest.mark.parametrize('body', [
+    {'ids': []},
+    {'ids': [1, 'abc']},
+    {'ids': [True]},
+    {'ids': [1.5]},
+    {'ids': None},
+    {'id': [1]},
+    'not a list',
+])
+def test_invalid_ids_are_rejected(client, body):
+    response = client.post('/api/v1/personas:batchGet', json=body)
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_invalid_ids_parameter_is_rejected(client):
+    assert client.get('/api/v1/personas?ids=1,x').status_code == 400
+
+def test_too_many_ids_are_rejected(app, client):
+    app.config['BATCH_GET_MAX_IDS'] = 2
+
+    assert client.post('/api/v1/personas:batchGet', json=[1, 2, 3]).status_code == 400
+    assert client.post('/api/v1/personas:batchGet', json=[1, 2]).status_code == 200
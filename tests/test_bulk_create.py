@@ -0,0 +1,56 @@
+"""
+Tests for POST /api/v1/personas/bulk
+"""
+from app.services import validate_persona_shape
+
+def test_valid_items_are_created_in_input_order(client):
+    items = [{'name': f'persona {index}', 'demographic': {'age': 20 + index}} for index in range(5)]
+    response = client.post('/api/v1/personas/bulk', json=items)
+
+    assert response.status_code == 201
+    created = response.get_json()['created']
+    assert [entry['index'] for entry in created] == list(range(5))
+    for entry in created:
+        persona = client.get(f"/api/v1/personas/{entry['id']}").get_json()
+        assert persona['name'] == f"persona {entry['index']}"
+        assert persona['demographic']['age'] == 20 + entry['index']
+
+def test_bad_items_are_reported_without_failing_the_batch(client):
+    items = [
+        {'name': 'first', 'contextual': {'season': 'summer'}},
+        {'name': 'bad demographic', 'demographic': 'foo'},
+        {'name': None},
+        {'demographic': {'age': 30}},
+        {'name': 'typed', 'demographic': {'age': 'old', 'latitude': True, 'planet': 'Mars'}},
+        {'name': 'bad category', 'psychographic': {'interests': 'not a list'}},
+        'not an object',
+        {'name': 'last', 'demographic': {'city': 'Lyon', 'income': 'High', 'latitude': 45.76}},
+    ]
+    response = client.post('/api/v1/personas/bulk', json=items)
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [entry['index'] for entry in body['created']] == [0, 7]
+    assert [error['index'] for error in body['errors']] == [1, 2, 3, 4, 5, 6]
+    errors = {error['index']: error for error in body['errors']}
+    assert errors[1]['error'] == 'Demographic data must be an object'
+    assert errors[2]['error'] == 'Name must be a non-empty string'
+    assert errors[3]['error'] == 'Name is required'
+    assert len(errors[4]['details']) == 3
+    assert errors[5]['error'] == 'Invalid psychographic data'
+
+    last = client.get(f"/api/v1/personas/{body['created'][1]['id']}").get_json()
+    assert last['name'] == 'last'
+    assert last['demographic']['city'] == 'Lyon'
+
+def test_batch_of_only_bad_items_is_rejected(client):
+    response = client.post('/api/v1/personas/bulk', json=[{'name': ''}, {'name': 'x', 'demographic': []}])
+
+    assert response.status_code == 400
+    assert response.get_json()['created'] == []
+    assert client.get('/api/v1/personas').get_json()['total'] == 0
+
+def test_exported_demographic_ids_are_ignored():
+    is_valid, error = validate_persona_shape({'name': 'copy', 'demographic': {'id': 1, 'persona_id': 1, 'age': None}})
+
+    assert is_valid, error
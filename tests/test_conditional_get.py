@@ -0,0 +1,95 @@
+"""
+Tests for ETag and Last-Modified handling of persona reads
+"""
+import pytest
+
+@pytest.fixture
+def persona_id(client):
+    response = client.post('/api/v1/personas', json={'name': 'cached', 'contextual': {'season': 'spring'}})
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+def test_get_one_matching_etag_is_not_modified(client, persona_id):
+    first = client.get(f'/api/v1/personas/{persona_id}')
+    assert first.status_code == 200 and first.headers['ETag']
+
+    response = client.get(f'/api/v1/personas/{persona_id}', headers={'If-None-Match': first.headers['ETag']})
+
+    assert response.status_code == 304
+    assert response.headers['ETag'] == first.headers['ETag']
+    assert response.get_data() == b''
+
+def test_get_one_is_modified_after_put(client, persona_id):
+    etag = client.get(f'/api/v1/personas/{persona_id}').headers['ETag']
+    assert client.put(f'/api/v1/personas/{persona_id}', json={'name': 'renamed'}).status_code == 200
+
+    response = client.get(f'/api/v1/personas/{persona_id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.get_json()['name'] == 'renamed'
+
+def test_get_one_if_modified_since(client, persona_id):
+    last_modified = client.get(f'/api/v1/personas/{persona_id}').headers['Last-Modified']
+
+    response = client.get(f'/api/v1/personas/{persona_id}', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+
+    response = client.get(f'/api/v1/personas/{persona_id}',
+                          headers={'If-Modified-Since': 'Sat, 01 Jan 2000 00:00:00 GMT'})
+    assert response.status_code == 200
+
+def test_if_none_match_takes_precedence(client, persona_id):
+    last_modified = client.get(f'/api/v1/personas/{persona_id}').headers['Last-Modified']
+
+    response = client.get(f'/api/v1/personas/{persona_id}',
+                          headers={'If-None-Match': '"stale"', 'If-Modified-Since': last_modified})
+
+    assert response.status_code == 200
+
+def test_missing_persona_with_validators_is_not_found(client):
+    assert client.get('/api/v1/personas/999', headers={'If-None-Match': '"999"'}).status_code == 404
+
+def test_list_matching_etag_is_not_modified(client, persona_id):
+    first = client.get('/api/v1/personas')
+    assert first.status_code == 200
+
+    response = client.get('/api/v1/personas', headers={'If-None-Match': first.headers['ETag']})
+
+    assert response.status_code == 304
+
+@pytest.mark.parametrize('change', ['put', 'patch', 'create'])
+def test_list_is_modified_after_a_write(client, persona_id, change):
+    etag = client.get('/api/v1/personas').headers['ETag']
+    if change == 'put':
+        client.put(f'/api/v1/personas/{persona_id}', json={'name': 'renamed'})
+    elif change == 'patch':
+        client.patch(f'/api/v1/personas/{persona_id}/attributes/contextual', json={'season': 'fall'})
+    else:
+        client.post('/api/v1/personas', json={'name': 'another'})
+
+    response = client.get('/api/v1/personas', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+def test_narrowed_list_has_its_own_etag(client, persona_id):
+    etag = client.get('/api/v1/personas').headers['ETag']
+
+    response = client.get('/api/v1/personas?fields=name', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+
+def test_cached_persona_is_modified_after_put(client, persona_id, monkeypatch):
+    from app.extensions import persona_cache
+    monkeypatch.setattr(persona_cache, 'maxsize', 100)
+    monkeypatch.setattr(persona_cache, 'ttl', 30.0)
+    etag = client.get(f'/api/v1/personas/{persona_id}').headers['ETag']
+    assert client.get(f'/api/v1/personas/{persona_id}', headers={'If-None-Match': etag}).status_code == 304
+
+    client.put(f'/api/v1/personas/{persona_id}', json={'name': 'renamed'})
+    response = client.get(f'/api/v1/personas/{persona_id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert response.get_json()['name'] == 'renamed'
+    persona_cache.clear()
@@ -0,0 +1,43 @@
+"""
+Tests for GET /api/v1/personas/export
+"""
+import json
+from datetime import datetime
+import pytest
+
+@pytest.fixture
+def persona_ids(client):
+    response = client.post('/api/v1/personas/bulk', json=[{'name': f'exported {index}'} for index in range(7)])
+    assert response.status_code == 201
+    return [entry['id'] for entry in response.get_json()['created']]
+
+def test_streams_every_persona(client, persona_ids):
+    response = client.get('/api/v1/personas/export?chunk_size=3')
+
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == persona_ids
+
+@pytest.mark.parametrize('chunk_size', [0, -1, 5001])
+def test_chunk_size_out_of_range_is_rejected(client, chunk_size):
+    response = client.get(f'/api/v1/personas/export?chunk_size={chunk_size}')
+
+    assert response.status_code == 400
+    assert 'chunk_size' in response.get_json()['error']
+
+def test_chunk_size_limit_is_configurable(app, client):
+    app.config['EXPORT_MAX_CHUNK_SIZE'] = 10
+
+    assert client.get('/api/v1/personas/export?chunk_size=11').status_code == 400
+    assert client.get('/api/v1/personas/export?chunk_size=10').status_code == 200
+
+def test_next_cursor_overlaps_the_export(app, client, persona_ids):
+    response = client.get('/api/v1/personas/export')
+
+    started_at = datetime.fromisoformat(response.headers['X-Export-Started-At'])
+    next_since = datetime.fromisoformat(response.headers['X-Export-Next-Updated-Since'])
+    assert (started_at - next_since).total_seconds() == app.config.get('EXPORT_CURSOR_OVERLAP_SECONDS', 60.0)
+
+    # Personas written just before the export began are exported again
+    lines = client.get('/api/v1/personas/export', query_string={'updated_since': next_since.isoformat()})
+    assert len(lines.get_data(as_text=True).splitlines()) == len(persona_ids)
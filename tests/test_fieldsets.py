@@ -0,0 +1,73 @@
+"""
+Tests for sparse fieldsets: the fields= and include= parameters of persona reads
+"""
+import pytest
+from app.fieldsets import parse_field_selection
+
+@pytest.fixture
+def persona_id(client):
+    response = client.post('/api/v1/personas', json={
+        'name': 'sparse',
+        'demographic': {'city': 'Oslo', 'age': 41},
+        'psychographic': {'interests': ['skiing'], 'lifestyle': 'active'},
+        'contextual': {'season': 'winter'},
+    })
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+@pytest.mark.parametrize('query', [
+    'include=demographics',
+    'include=demographic,unknown',
+    'fields=nickname',
+    'fields=demographic.shoe_size',
+    'fields=social.interests',
+])
+def test_unknown_fields_and_sections_are_rejected(client, persona_id, query):
+    for url in (f'/api/v1/personas/{persona_id}?{query}',
+                f'/api/v1/personas?{query}',
+                f'/api/v1/personas?ids={persona_id}&{query}'):
+        response = client.get(url)
+        assert response.status_code == 400, url
+        assert 'error' in response.get_json()
+
+    response = client.post(f'/api/v1/personas:batchGet?{query}', json=[persona_id])
+    assert response.status_code == 400
+
+def test_fields_narrow_the_persona(client, persona_id):
+    body = client.get(f'/api/v1/personas/{persona_id}?fields=name,demographic.city,psychographic.interests').get_json()
+
+    assert body == {
+        'id': persona_id,
+        'name': 'sparse',
+        'demographic': {'city': 'Oslo'},
+        'psychographic': {'interests': ['skiing']},
+    }
+
+def test_include_adds_sections_to_persona_columns(client, persona_id):
+    body = client.get(f'/api/v1/personas/{persona_id}?include=contextual').get_json()
+
+    assert set(body) == {'id', 'name', 'created_at', 'updated_at', 'contextual'}
+    assert body['contextual'] == {'season': 'winter'}
+
+def test_selection_applies_to_batch_get(client, persona_id):
+    body = client.post('/api/v1/personas:batchGet?fields=name', json=[persona_id, 999]).get_json()
+
+    assert body['personas'] == [{'id': persona_id, 'name': 'sparse'}]
+    assert body['missing'] == [999]
+
+def test_narrowed_response_has_its_own_etag(client, persona_id):
+    full = client.get(f'/api/v1/personas/{persona_id}')
+    narrow = client.get(f'/api/v1/personas/{persona_id}?fields=name')
+
+    assert full.headers['ETag'] != narrow.headers['ETag']
+    response = client.get(f'/api/v1/personas/{persona_id}?fields=name',
+                          headers={'If-None-Match': full.headers['ETag']})
+    assert response.status_code == 200
+
+def test_parse_field_selection():
+    assert parse_field_selection() is None
+    assert parse_field_selection('name, ,demographic').persona_fields == ('id', 'name')
+    selection = parse_field_selection('demographic.age', 'demographic')
+    assert selection.sections == {'demographic': None}
+    with pytest.raises(ValueError):
+        parse_field_selection(include='name')
@@ -0,0 +1,65 @@
+"""
+Tests for the bulk import script
+"""
+import json
+import pytest
+from sqlalchemy import select
+from app.models import Persona, init_db
+from import_personas import import_personas
+
+RECORDS = [
+    {'name': 'first', 'demographic': {'age': 30}},
+    {'name': 'bad demographic', 'demographic': 'x'},
+    {'name': 'bad season', 'contextual': {'season': 'monsoon'}},
+    None,
+    {'name': 'second'},
+    {'name': None},
+    {'name': 'third', 'contextual': {'season': 'winter'}},
+]
+
+@pytest.fixture
+def session(tmp_path):
+    session = init_db(f"sqlite:///{tmp_path / 'import.db'}")
+    yield session
+    session.close()
+
+@pytest.fixture
+def ndjson_path(tmp_path):
+    path = tmp_path / 'personas.ndjson'
+    lines = [json.dumps(record) if record is not None else '{not json' for record in RECORDS]
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+def test_malformed_records_are_rejected_with_their_line(session, ndjson_path, capsys):
+    created, rejected = import_personas(session, ndjson_path, 'ndjson', batch_size=3)
+
+    assert (created, rejected) == (3, 4)
+    assert sorted(session.scalars(select(Persona.name))) == ['first', 'second', 'third']
+    output = capsys.readouterr().out
+    for line in (2, 3, 4, 6):
+        assert f'Rejected: line {line}: ' in output
+    assert 'line 3: Invalid contextual data' in output
+
+def test_resume_continues_after_the_checkpoint(session, ndjson_path, capsys):
+    checkpoint_path = ndjson_path + '.checkpoint'
+    import_personas(session, ndjson_path, 'ndjson', batch_size=3, checkpoint_path=checkpoint_path)
+    with open(checkpoint_path) as file:
+        checkpoint = json.load(file)
+    assert checkpoint['created'] == 3 and checkpoint['rejected'] == 4
+
+    # Rewind to the end of the first batch and resume from there
+    with open(ndjson_path, 'rb') as file:
+        checkpoint.update(position=len(b''.join(file.readlines()[:3])), created=1, rejected=2)
+    with open(checkpoint_path, 'w') as file:
+        json.dump(checkpoint, file)
+    session.query(Persona).filter(Persona.name != 'first').delete()
+    session.commit()
+    capsys.readouterr()
+
+    created, rejected = import_personas(session, ndjson_path, 'ndjson', batch_size=3,
+                                        checkpoint_path=checkpoint_path, resume=True)
+
+    assert (created, rejected) == (3, 4)
+    output = capsys.readouterr().out
+    assert 'Rejected: line 4: ' in output and 'Rejected: line 6: ' in output
+    assert 'line 2:' not in output
@@ -0,0 +1,45 @@
+"""
+Tests for GET /api/v1/personas/near against a brute-force distance ranking
+"""
+import random
+import pytest
+from app.services import haversine_km
+
+@pytest.fixture
+def locations(client):
+    rng = random.Random(7)
+    # A dense cluster, a sparse spread and points on both sides of the antimeridian
+    points = [(52.5 + rng.uniform(-1, 1), 13.4 + rng.uniform(-1, 1)) for _ in range(150)]
+    points += [(rng.uniform(-80, 80), rng.uniform(-180, 180)) for _ in range(100)]
+    points += [(-17.0, 179.9), (-17.1, -179.9), (-16.5, 178.0)]
+    response = client.post('/api/v1/personas/bulk', json=[
+        {'name': f'located {index}', 'demographic': {'latitude': lat, 'longitude': lng}}
+        for index, (lat, lng) in enumerate(points)
+    ])
+    assert response.status_code == 201
+    return {entry['id']: points[entry['index']] for entry in response.get_json()['created']}
+
+def expected(locations, lat, lng, radius_km, k):
+    ranked = sorted((haversine_km(lat, lng, *point), persona_id) for persona_id, point in locations.items())
+    return [persona_id for distance, persona_id in ranked if radius_km is None or distance <= radius_km][:k]
+
+@pytest.mark.parametrize('lat, lng, radius_km, k', [
+    (52.5, 13.4, None, 10),
+    (52.5, 13.4, 20, 50),
+    (52.5, 13.4, 5000, 5),
+    (52.5, 13.4, 5000, 200),
+    (0.0, 0.0, None, 25),
+    (0.0, 0.0, 1500, 10),
+    (-17.0, -179.95, 300, 10),
+    (89.0, 0.0, None, 3),
+])
+def test_matches_brute_force_ranking(client, locations, lat, lng, radius_km, k):
+    params = {'lat': lat, 'lng': lng, 'k': k}
+    if radius_km is not None:
+        params['radius_km'] = radius_km
+    body = client.get('/api/v1/personas/near', query_string=params).get_json()
+
+    assert [persona['id'] for persona in body['personas']] == expected(locations, lat, lng, radius_km, k)
+    for persona in body['personas']:
+        distance = haversine_km(lat, lng, *locations[persona['id']])
+        assert persona['distance_km'] == pytest.approx(distance, abs=1e-3)
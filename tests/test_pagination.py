@@ -0,0 +1,69 @@
+"""
+Tests for offset and cursor pagination of GET /api/v1/personas
+"""
+import pytest
+
+@pytest.fixture
+def persona_ids(client):
+    # Two bulk requests: personas within one share an updated_at, so the
+    # walk crosses both ties and distinct timestamps
+    ids = []
+    for batch in range(2):
+        response = client.post('/api/v1/personas/bulk',
+                               json=[{'name': f'page {batch}.{index}'} for index in range(6)])
+        assert response.status_code == 201
+        ids += [entry['id'] for entry in response.get_json()['created']]
+    return ids
+
+def walk(client, **params):
+    """Follow next_cursor from an empty cursor to the end, returning the IDs seen"""
+    seen = []
+    cursor = ''
+    while cursor is not None:
+        response = client.get('/api/v1/personas', query_string=dict(params, cursor=cursor, per_page=5))
+        assert response.status_code == 200
+        body = response.get_json()
+        assert 'page' not in body
+        seen += [persona['id'] for persona in body['personas']]
+        cursor = body['next_cursor']
+    return seen
+
+def test_cursor_walk_has_no_gaps_or_duplicates(client, persona_ids):
+    seen = walk(client)
+
+    assert len(seen) == len(set(seen))
+    assert sorted(seen) == sorted(persona_ids)
+    offset = client.get('/api/v1/personas', query_string={'per_page': 100}).get_json()
+    assert seen == [persona['id'] for persona in offset['personas']]
+
+def test_cursor_walk_sees_updated_persona_once(client, persona_ids):
+    seen = walk(client)
+    assert client.put(f'/api/v1/personas/{persona_ids[0]}', json={'name': 'renamed'}).status_code == 200
+
+    assert walk(client) == [persona_ids[0]] + [persona_id for persona_id in seen if persona_id != persona_ids[0]]
+
+def test_empty_cursor_starts_cursor_mode(client, persona_ids):
+    body = client.get('/api/v1/personas?cursor=&per_page=5').get_json()
+
+    assert 'page' not in body and 'total' not in body
+    assert body['next_cursor'] is not None
+
+@pytest.mark.parametrize('query', [
+    'sort=age&cursor=',
+    'sort=name&cursor=WyIyMDI2LTAxLTAxVDAwOjAwOjAwIiwgMV0',
+    'cursor=not-a-cursor',
+])
+def test_invalid_cursor_requests_are_rejected(client, persona_ids, query):
+    response = client.get(f'/api/v1/personas?{query}')
+
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+def test_offset_pages_have_no_gaps(client, persona_ids):
+    seen = []
+    for page in range(1, 4):
+        body = client.get('/api/v1/personas', query_string={'page': page, 'per_page': 5}).get_json()
+        assert body['page'] == page and body['total'] == len(persona_ids)
+        seen += [persona['id'] for persona in body['personas']]
+
+    assert sorted(seen) == sorted(persona_ids)
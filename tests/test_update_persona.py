@@ -0,0 +1,79 @@
+"""
+Tests that a persona PUT is one unit of work
+"""
+import pytest
+from sqlalchemy import event
+from app.extensions import db
+from app.services import PersonaService
+
+FULL_UPDATE = {
+    'name': 'updated',
+    'demographic': {'city': 'Lisbon', 'age': 52},
+    'psychographic': {'interests': ['surfing'], 'lifestyle': 'relaxed'},
+    'behavioral': {'browsing_habits': ['podcasts']},
+    'contextual': {'season': 'summer'},
+}
+
+@pytest.fixture
+def persona_id(client):
+    response = client.post('/api/v1/personas', json={
+        'name': 'original',
+        'demographic': {'city': 'Porto', 'age': 50},
+        'psychographic': {'interests': ['reading']},
+    })
+    assert response.status_code == 201
+    return response.get_json()['id']
+
+@pytest.fixture
+def commits(app):
+    """List that records every database commit made while a test runs"""
+    recorded = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(connection):
+        recorded.append(connection)
+
+    event.listen(engine, 'commit', record)
+    yield recorded
+    event.remove(engine, 'commit', record)
+
+def test_full_section_put_commits_once(client, persona_id, commits):
+    response = client.put(f'/api/v1/personas/{persona_id}', json=FULL_UPDATE)
+
+    assert response.status_code == 200
+    assert len(commits) == 1
+    body = client.get(f'/api/v1/personas/{persona_id}').get_json()
+    assert body['name'] == 'updated'
+    assert body['demographic']['city'] == 'Lisbon'
+    assert body['psychographic'] == {'interests': ['surfing'], 'lifestyle': 'relaxed'}
+    assert body['contextual'] == {'season': 'summer'}
+
+def test_invalid_section_leaves_persona_unchanged(client, persona_id, commits):
+    before = client.get(f'/api/v1/personas/{persona_id}').get_json()
+
+    response = client.put(f'/api/v1/personas/{persona_id}', json=dict(FULL_UPDATE, contextual={'season': 'monsoon'}))
+
+    assert response.status_code == 400
+    assert commits == []
+    assert client.get(f'/api/v1/personas/{persona_id}').get_json() == before
+
+def test_failure_mid_update_leaves_persona_unchanged(client, persona_id, commits, monkeypatch):
+    before = client.get(f'/api/v1/personas/{persona_id}').get_json()
+    apply_attribute_data = PersonaService._apply_attribute_data
+
+    def fail_on_contextual(self, persona, category, data):
+        if category.value == 'contextual':
+            raise RuntimeError('simulated failure')
+        return apply_attribute_data(self, persona, category, data)
+
+    monkeypatch.setattr(PersonaService, '_apply_attribute_data', fail_on_contextual)
+    response = client.put(f'/api/v1/personas/{persona_id}', json=FULL_UPDATE)
+
+    assert response.status_code == 500
+    assert commits == []
+    monkeypatch.undo()
+    assert client.get(f'/api/v1/personas/{persona_id}').get_json() == before
+    # The side index still holds the old values
+    listed = client.get('/api/v1/personas', query_string={'psychographic.interests': 'reading'}).get_json()
+    assert [persona['id'] for persona in listed['personas']] == [persona_id]
@@ -4,8 +4,9 @@ Verify that default personas exist in the database.
 """
 import os
 import sys
-from sqlalchemy import text, create_engine
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
+from app.database import get_engine
 
 # Get the absolute path to the database
 db_path = os.path.join(
@@ -25,7 +26,7 @@ def main():
     
     # Create a direct connection to the database
     try:
-        engine = create_engine(db_uri)
+        engine = get_engine(db_uri)
         Session = sessionmaker(bind=engine)
         session = Session()
         